@@ -3,6 +3,17 @@ import pandas as pd
 import plotly.express as px
 import matplotlib.pyplot as plt
 import base64
+import os
+
+from cache import CACHES, all_stats, clear_dependents, emit_metrics, file_version, known_dependencies
+from chart_specs import build_figure, build_specs, chart_code, figure_for, spec_frame, spec_hash
+from datasets import load_csv
+from explorer import table_for
+from ingest import IngestBusy, ingest_csv
+from previews import check_export, progressive_chart
+from rollups import MEASURES, UNASSIGNED, continent_table, country_table, precompute
+from sampling import MAX_SCATTER_POINTS, cap_points, seed_for, stratified_sample
+from sessions import SESSIONS, session_id
 
 # --- Page config and global styling ---
 st.set_page_config(page_title="Pouring Perspectives", layout="wide")
@@ -107,12 +118,52 @@ st.markdown(f"""
 """, unsafe_allow_html=True)
 
 # --- Load data ---
-df_coffee_cons = pd.read_csv("data/coffee-consumption-by-country-2025.csv")
-df_coffee_prod = pd.read_csv("data/coffee-producing-countries-2025.csv")
-df_milk      = pd.read_csv("data/milk-consumption-by-country-2025.csv")
-df_pop       = pd.read_csv("data/2018worldpop.csv")
-df_gap       = pd.read_csv("data/gapminder_alcohol.csv")
-df_pop.rename(columns={"Country": "country"}, inplace=True)
+# load_csv caches across reruns and returns shared frames: don't modify in place
+df_coffee_cons = load_csv("data/coffee-consumption-by-country-2025.csv")
+df_coffee_prod = load_csv("data/coffee-producing-countries-2025.csv")
+df_milk      = load_csv("data/milk-consumption-by-country-2025.csv")
+df_gap       = load_csv("data/gapminder_alcohol.csv")
+# population and continent joins for every country-level dataset (cached)
+precompute()
+# surface a missing Chrome for chart previews in the log on the first run
+check_export()
+
+# Per-upload memory budget for chunked ingest (chunk buffer + aggregates).
+UPLOAD_MEMORY_CEILING = int(os.environ.get("UPLOAD_MEMORY_CEILING_MB", "64")) * 1024 * 1024
+
+# Tables browsable in the Data tab: source files (for cache versioning) and how to build them.
+EXPLORER_SOURCES = {
+    "US Alcohol Consumption by State": (
+        ["data/Alcohol_Consumption_US.csv"],
+        lambda: load_csv("data/Alcohol_Consumption_US.csv"),
+    ),
+    "Global Alcohol Use & AUD Deaths": (
+        ["data/Final_Data.csv"],
+        lambda: load_csv("data/Final_Data.csv", encoding="latin-1"),
+    ),
+    "Coffee Consumption & Production": (
+        ["data/coffee-consumption-by-country-2025.csv", "data/coffee-producing-countries-2025.csv"],
+        lambda: pd.merge(
+            load_csv("data/coffee-consumption-by-country-2025.csv"),
+            load_csv("data/coffee-producing-countries-2025.csv"),
+            on=["flagCode", "country"], how="outer"
+        ),
+    ),
+    **{
+        f"{measure.title()} per Person": (
+            [MEASURES[measure]["path"], "data/2018worldpop.csv", "data/globconum.csv"],
+            lambda measure=measure: country_table(measure).reset_index(),
+        )
+        for measure in MEASURES
+    },
+}
+
+# Heavy per-session objects live in SESSIONS, which drops them when the tab goes idle.
+SESSIONS.touch()
+
+# Operators open the app with ?admin=<ADMIN_TOKEN> to get the cache admin tab.
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+is_admin = bool(ADMIN_TOKEN) and st.query_params.get("admin") == ADMIN_TOKEN
 
 # --- Tabs ---
 tabs = st.tabs([
@@ -123,8 +174,10 @@ tabs = st.tabs([
     "Multivariate Viz",
     "Interactivity & Narrative",
     "Data Prep & Grammar",
+    "Data",
+    "Your Data",
     "Conclusion"
-])
+] + (["Admin"] if is_admin else []))
 
 # --- Introduction (Main Page) ---
 with tabs[0]:
@@ -149,30 +202,8 @@ with tabs[1]:
     st.subheader("✅ Good: High Data-Ink Ratio")
     c1, c2 = st.columns([2,1])
     c1.markdown("**Description:** This bar chart highlights per-capita coffee consumption using a clean, high data-ink ratio design.")
-    df = df_coffee_cons.sort_values(
-        "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022", 
-        ascending=False
-    ).head(10)
-    fig = px.bar(
-        df,
-        x="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-        y="country",
-        orientation="h",
-        color_discrete_sequence=["white"]
-    )
-    fig.update_traces(marker_line_width=0)
-    fig.update_layout(
-        xaxis_title="Coffee Consumption per Capita (2022) kg",
-        yaxis_title="Country",
-        showlegend=False,
-        margin=dict(l=0, r=0, t=30, b=0),
-        plot_bgcolor="rgba(0,0,0,0)"
-    )
-    # Invert bar order: largest on top
-    fig.update_yaxes(autorange="reversed")
-    fig.update_traces(hovertemplate='%{x} kg <extra></extra>')
-    fig.update_layout(title="High Data-Ink Ratio: Coffee Consumption per Capita (kg)")
-    c1.plotly_chart(fig, use_container_width=True)
+    df = spec_frame("design_good")
+    c1.plotly_chart(figure_for("design_good"), use_container_width=True)
     c2.markdown("""
 **Why this works:**  
 By maximizing the data-ink ratio and stripping away non-essential decoration, this bar chart directs the viewer’s attention to the true data—per‑capita coffee consumption—allowing precise, fast comparisons.
@@ -186,34 +217,7 @@ Edward Tufte, in *The Visual Display of Quantitative Information*, argues that e
 - Annotate sparingly to provide context without clutter.
     """)
     if c2.checkbox("Show code: Good example", key="good_code"):
-        c2.code('''# Good Example Code
-import pandas as pd
-import plotly.express as px
-
-df = pd.read_csv("data/coffee-consumption-by-country-2025.csv")
-df = df.sort_values(
-    "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-    ascending=False
-).head(10)
-
-fig = px.bar(
-    df,
-    x="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-    y="country",
-    orientation="h",
-    color_discrete_sequence=["white"]
-)
-fig.update_traces(marker_line_width=0)
-fig.update_layout(
-    xaxis_title="Coffee Consumption per Capita (2022) kg",
-    yaxis_title="Country",
-    showlegend=False,
-    margin=dict(l=0, r=0, t=0, b=0),
-    plot_bgcolor="rgba(0,0,0,0)"
-)
-fig.update_yaxes(autorange="reversed")
-fig.update_traces(hovertemplate='%{x} kg <extra></extra>')
-fig.show()''', language="python")
+        c2.code(chart_code("design_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: Chartjunk Overload")
@@ -309,22 +313,14 @@ with tabs[2]:
     Our choice of palette can make or break readability. Perceptually uniform scales like Viridis/Cividis improve interpretation for all users, including those with color vision deficiencies—aligning with Tufte’s principle that form follows function.
     """)
 
+    # Slots are laid out first so the section's text renders before any chart
+    # is built; build_specs then fills them in order, one figure at a time.
+    slots = {}
+
     # Good
     st.subheader("✅ Good: Accessible Palette")
     c1, c2 = st.columns([2,1])
-    df_map = df_coffee_prod.sort_values(
-        "CoffeeProducing_CoffeeProduction_tonnes_2022", ascending=False
-    ).head(15)
-    figc1 = px.choropleth(
-        df_map,
-        locations="country",
-        locationmode="country names",
-        color="CoffeeProducing_CoffeeProduction_tonnes_2022",
-        color_continuous_scale="Viridis"
-    )
-    figc1.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figc1.update_layout(title="Accessible Palette: Coffee Production by Country")
-    c1.plotly_chart(figc1, use_container_width=True)
+    slots["color_good"] = c1.empty()
     c2.markdown("""
 **Why this works:**  
 Perceptually uniform colormaps like Viridis ensure that equal steps in data are perceived as equal steps in color, avoiding artificial emphasis.
@@ -338,91 +334,37 @@ ICA17 emphasizes accessibility; choosing palettes that work for color-deficient
 - Avoid rainbow palettes that imply false variation.
     """)
     if c2.checkbox("Show code: Good example (Color)", key="color_good_code"):
-        c2.code('''# Good Example Code: Accessible Palette
-import pandas as pd
-import plotly.express as px
-
-df_map = pd.read_csv("data/coffee-producing-countries-2025.csv").sort_values(
-    "CoffeeProducing_CoffeeProduction_tonnes_2022", ascending=False
-).head(15)
-
-figc1 = px.choropleth(
-    df_map,
-    locations="country",
-    locationmode="country names",
-    color="CoffeeProducing_CoffeeProduction_tonnes_2022",
-    color_continuous_scale="Viridis"
-)
-figc1.show()''', language="python")
+        c2.code(chart_code("color_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: Rainbow Palette")
     c1, c2 = st.columns([2,1])
-    figc2 = px.choropleth(
-        df_map,
-        locations="country",
-        locationmode="country names",
-        color="CoffeeProducing_CoffeeProduction_tonnes_2022",
-        color_continuous_scale="Rainbow"
-    )
-    figc2.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figc2.update_layout(title="Rainbow Palette: Coffee Production by Country")
-    c1.plotly_chart(figc2, use_container_width=True)
+    slots["color_bad"] = c1.empty()
     c2.markdown("""
     **Rainbow palettes**  
     - Introduce false steps.  
     - Hard for color-deficient viewers.
     """)
     if c2.checkbox("Show code: Bad example (Color)", key="color_bad_code"):
-        c2.code('''# Bad Example Code: Rainbow Palette
-import pandas as pd
-import plotly.express as px
-
-df_map = pd.read_csv("data/coffee-producing-countries-2025.csv").sort_values(
-    "CoffeeProducing_CoffeeProduction_tonnes_2022", ascending=False
-).head(15)
-
-figc2 = px.choropleth(
-    df_map,
-    locations="country",
-    locationmode="country names",
-    color="CoffeeProducing_CoffeeProduction_tonnes_2022",
-    color_continuous_scale="Rainbow"
-)
-figc2.show()''', language="python")
+        c2.code(chart_code("color_bad"), language="python")
 
     # Ugly
     st.subheader("💀 Ugly: Overloaded Pie")
     c1, c2 = st.columns([2,1])
-    figc3 = px.pie(
-        df_map,
-        values="CoffeeProducing_CoffeeProduction_tonnes_2022",
-        names="country"
-    )
-    figc3.update_traces(textinfo='none')
-    figc3.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figc3.update_layout(title="Overloaded Pie: Coffee Production by Country")
-    c1.plotly_chart(figc3, use_container_width=True)
+    slots["color_ugly"] = c1.empty()
     c2.markdown("""
     **Too many discrete colors** overwhelm the eye.  
     - Group minor slices.  
     - Prefer ranked bars.
     """)
     if c2.checkbox("Show code: Ugly example (Color)", key="color_ugly_code"):
-        c2.code('''# Ugly Example Code: Overloaded Pie
-import pandas as pd
-import plotly.express as px
-
-df_map = pd.read_csv("data/coffee-producing-countries-2025.csv").sort_values(
-    "CoffeeProducing_CoffeeProduction_tonnes_2022", ascending=False
-).head(15)
+        c2.code(chart_code("color_ugly"), language="python")
 
-figc3 = px.pie(
-    df_map,
-    values="CoffeeProducing_CoffeeProduction_tonnes_2022",
-    names="country"
-)
-figc3.show()''', language="python")
+    color_deps = ("data/coffee-producing-countries-2025.csv",)
+    build_specs(
+        ["color_good", "color_bad", "color_ugly"],
+        lambda name, fig: progressive_chart(slots[name], fig, key=name, version=spec_hash(name), deps=color_deps)
+    )
 
 # --- Visual Encoding ---
 with tabs[3]:
@@ -435,22 +377,7 @@ with tabs[3]:
     # Good
     st.subheader("✅ Good: Position & Length")
     c1, c2 = st.columns([2,1])
-    df_bar = df_coffee_cons.sort_values(
-        "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022", ascending=False
-    ).head(10)
-    figv1 = px.bar(
-        df_bar,
-        x="country",
-        y="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022"
-    )
-    figv1.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figv1.update_layout(
-        xaxis_title="Country",
-        yaxis_title="Coffee Consumption per Capita (kg)"
-    )
-    figv1.update_traces(hovertemplate='%{y}<extra></extra>')
-    figv1.update_layout(title="Position & Length: Coffee Consumption per Capita by Country")
-    c1.plotly_chart(figv1, use_container_width=True)
+    c1.plotly_chart(figure_for("enc_good"), use_container_width=True)
     c2.markdown("""
 **Why this works:**  
 Encoding values as aligned bar lengths leverages our innate ability to compare positions, yielding highly accurate judgments.
@@ -464,81 +391,31 @@ Cleveland & McGill’s research ranks position highest in perceptual accuracy; T
 - Reserve color for qualitative grouping, not primary value encoding.
     """)
     if c2.checkbox("Show code: Good example (Encoding)", key="enc_good_code"):
-        c2.code('''# Good Example Code: Bar encoding
-import pandas as pd
-import plotly.express as px
-
-df_bar = pd.read_csv("data/coffee-consumption-by-country-2025.csv").sort_values(
-    "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022", ascending=False
-).head(10)
-
-figv1 = px.bar(
-    df_bar,
-    x="country",
-    y="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022"
-)
-figv1.show()''', language="python")
+        c2.code(chart_code("enc_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: Pie for Ranking")
     c1, c2 = st.columns([2,1])
-    figv2 = px.pie(
-        df_bar,
-        values="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-        names="country"
-    )
-    figv2.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figv2.update_layout(title="Pie Chart: Coffee Consumption per Capita by Country")
-    c1.plotly_chart(figv2, use_container_width=True)
+    c1.plotly_chart(figure_for("enc_bad"), use_container_width=True)
     c2.markdown("""
     **Angles/areas are imprecise**  
     - Hard to order 8% vs 10%.  
     - Bars are better for ranking.
     """)
     if c2.checkbox("Show code: Bad example (Encoding)", key="enc_bad_code"):
-        c2.code('''# Bad Example Code: Pie encoding
-import pandas as pd
-import plotly.express as px
-
-df_bar = pd.read_csv("data/coffee-consumption-by-country-2025.csv").sort_values(
-    "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022", ascending=False
-).head(10)
-
-figv2 = px.pie(
-    df_bar, values="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-    names="country"
-)
-figv2.show()''', language="python")
+        c2.code(chart_code("enc_bad"), language="python")
 
     # Ugly
     st.subheader("💀 Ugly: Mis-scaled Symbols")
     c1, c2 = st.columns([2,1])
-    df_sym = pd.DataFrame({"A":[10], "B":[20]})
-    figv3 = px.scatter(
-        df_sym,
-        x="A",
-        y="B",
-        size="B",
-        size_max=60
-    )
-    figv3.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figv3.update_layout(title="Mis-scaled Symbols: Encoding Pitfall")
-    c1.plotly_chart(figv3, use_container_width=True)
+    c1.plotly_chart(figure_for("enc_ugly"), use_container_width=True)
     c2.markdown("""
     **Symbol area must scale linearly**  
     - Mis-sized icons exaggerate differences.  
     - Verify mapping of size to data.
     """)
     if c2.checkbox("Show code: Ugly example (Encoding)", key="enc_ugly_code"):
-        c2.code('''# Ugly Example Code: Mis-scaled symbols
-import pandas as pd
-import plotly.express as px
-
-df_sym = pd.DataFrame({"A":[10], "B":[20]})
-figv3 = px.scatter(
-    df_sym, x="A", y="B", size="B", size_max=60
-)
-figv3.show()''', language="python")
+        c2.code(chart_code("enc_ugly"), language="python")
 
 # --- Multivariate Visualization ---
 with tabs[4]:
@@ -548,27 +425,14 @@ with tabs[4]:
     Real-world data is complex. Techniques like bubble charts or scatter matrices let us explore multiple dimensions simultaneously—though Cairo cautions that clarity must not be sacrificed for richness.
     """)
 
+    # Slots are laid out first so the section's text renders before any chart
+    # is built; build_specs then fills them in order, one figure at a time.
+    slots = {}
+
     # Good
     st.subheader("✅ Good: Bubble Chart")
     c1, c2 = st.columns([2,1])
-    figm1 = px.scatter(
-        df_gap.dropna(subset=["alcconsumption","incomeperperson","suicideper100th","urbanrate"]),
-        x="incomeperperson",
-        y="alcconsumption",
-        size="suicideper100th",
-        color="urbanrate",
-        hover_name="country",
-        size_max=40,
-        log_x=True,
-        color_continuous_scale="Viridis"
-    )
-    figm1.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figm1.update_layout(
-        xaxis_title="Income per Person (USD)",
-        yaxis_title="Alcohol Consumption per Capita (L)"
-    )
-    figm1.update_layout(title="Bubble Chart: Alcohol vs Income vs Urbanization vs Suicide")
-    c1.plotly_chart(figm1, use_container_width=True)
+    slots["multi_good"] = c1.empty()
     c2.markdown("""
 **Why this works:**  
 Bubble charts encode multiple dimensions—position, size, color—in one view, revealing complex relationships at a glance.
@@ -582,84 +446,24 @@ Alberto Cairo warns that multivariate visuals must balance richness with clarity
 - Use color scales that support perceptual consistency.
     """)
     if c2.checkbox("Show code: Good example (Multivariate)", key="multi_good_code"):
-        c2.code('''# Good Example Code: Bubble chart
-import pandas as pd
-import plotly.express as px
-
-df = pd.read_csv("data/gapminder_alcohol.csv").dropna(
-    subset=["alcconsumption","incomeperperson","suicideper100th","urbanrate"]
-)
-
-figm1 = px.scatter(
-    df, x="incomeperperson", y="alcconsumption",
-    size="suicideper100th", color="urbanrate",
-    hover_name="country", log_x=True,
-    size_max=40, color_continuous_scale="Viridis"
-)
-figm1.show()''', language="python")
+        c2.code(chart_code("multi_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: Overcrowded Scatter")
     c1, c2 = st.columns([2,1])
-    figm2 = px.scatter(
-        df_gap,
-        x="incomeperperson",
-        y="alcconsumption",
-        title="No filtering → overplotting"
-    )
-    figm2.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figm2.update_layout(
-        xaxis_title="Income per Person (USD)",
-        yaxis_title="Alcohol Consumption per Capita (L)"
-    )
-    figm2.update_layout(title="Overcrowded Scatter: Income vs Alcohol")
-    c1.plotly_chart(figm2, use_container_width=True)
+    slots["multi_bad"] = c1.empty()
     c2.markdown("""
     **Overplotting hides patterns**  
     - Filter or sample data.  
     - Use transparency or jitter.
     """)
     if c2.checkbox("Show code: Bad example (Multivariate)", key="multi_bad_code"):
-        c2.code('''# Bad Example Code: Overcrowded scatter
-import pandas as pd
-import plotly.express as px
-
-df = pd.read_csv("data/gapminder_alcohol.csv")
-figm2 = px.scatter(df, x="incomeperperson", y="alcconsumption")
-figm2.show()''', language="python")
+        c2.code(chart_code("multi_bad"), language="python")
 
     # Ugly
     st.subheader("💀 Ugly: 3D Scatter (fixed)")
     c1, c2 = st.columns([2,1])
-
-    # drop rows with any NaN in these four columns
-    df3d = df_gap.dropna(subset=[
-        "incomeperperson",
-        "alcconsumption",
-        "suicideper100th",
-        "urbanrate"
-    ])
-
-    figm3 = px.scatter_3d(
-        df3d,
-        x="incomeperperson",
-        y="alcconsumption",
-        z="suicideper100th",
-        color="urbanrate",
-        size="urbanrate",
-        size_max=20,         # caps the maximum marker size
-        title=None
-    )
-    figm3.update_layout(margin=dict(l=0, r=0, t=30, b=0))
-    figm3.update_layout(
-        scene=dict(
-            xaxis_title="Income per Person (USD)",
-            yaxis_title="Alcohol Consumption per Capita (L)",
-            zaxis_title="Suicide Rate per 100k"
-        )
-    )
-    figm3.update_layout(title="3D Scatter: Income, Alcohol, and Suicide")
-    c1.plotly_chart(figm3, use_container_width=True)
+    slots["multi_ugly"] = c1.empty()
 
     c2.markdown("""
     **3D scatter with no missing sizes**  
@@ -668,19 +472,18 @@ figm2.show()''', language="python")
     - Even fixed, 3D often adds confusion—use sparingly!
     """)
     if c2.checkbox("Show code: Ugly example (Multivariate)", key="multi_ugly_code"):
-        c2.code('''# Ugly Example Code: 3D scatter
-import pandas as pd
-import plotly.express as px
+        c2.code(chart_code("multi_ugly"), language="python")
+
+    multi_deps = ("data/gapminder_alcohol.csv",)
 
-df3d = pd.read_csv("data/gapminder_alcohol.csv").dropna(
-    subset=["incomeperperson","alcconsumption","suicideper100th","urbanrate"]
-)
+    def place_multivariate(name, fig):
+        if name == "multi_ugly":
+            progressive_chart(slots[name], fig, key=name, version=spec_hash(name), deps=multi_deps)
+        else:
+            slots[name].plotly_chart(fig, use_container_width=True)
+
+    build_specs(["multi_good", "multi_bad", "multi_ugly"], place_multivariate)
 
-figm3 = px.scatter_3d(
-    df3d, x="incomeperperson", y="alcconsumption", z="suicideper100th",
-    color="urbanrate", size="urbanrate", size_max=20
-)
-figm3.show()''', language="python")
 # --- Interactivity & Narrative ---
 with tabs[5]:
     st.header("Interactivity & Narrative")
@@ -693,24 +496,22 @@ with tabs[5]:
     st.subheader("✅ Good: Overview → Filter → Details")
     c1, c2 = st.columns([2,1])
     continent = st.selectbox("Filter by continent", ["All","Europe","Asia","Americas","Africa"], key="filter")
-    df_int = df_gap.copy()
+    df_int = df_gap
+    # samples are memoized under the file's version, so reruns don't hash the frame
+    gap_version = file_version("data/gapminder_alcohol.csv")
     if continent != "All":
-        # placeholder: no continent in gapminder_alcohol, so simulate
-        df_int = df_int.sample(100)
-    fign1 = px.scatter(
-        df_int,
-        x="incomeperperson",
-        y="alcconsumption",
-        hover_name="country",
-        title=None
-    )
-    fign1.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    fign1.update_layout(
-        xaxis_title="Income per Person (USD)",
-        yaxis_title="Alcohol Consumption per Capita (L)"
+        # placeholder: no continent in gapminder_alcohol, so simulate with a
+        # seeded sample stratified by income band (same rows on every rerun)
+        income_band = pd.qcut(df_int["incomeperperson"], 4, labels=False).rename("income_band")
+        df_int = stratified_sample(
+            df_int, income_band, 100, seed=seed_for(continent),
+            version=gap_version, deps=("data/gapminder_alcohol.csv",)
+        )
+    df_int = cap_points(
+        df_int, MAX_SCATTER_POINTS, version=(gap_version, continent), deps=("data/gapminder_alcohol.csv",)
     )
-    fign1.update_layout(title="Interactive Scatter: Alcohol vs Income")
-    c1.plotly_chart(fign1, use_container_width=True)
+    # built from the filtered frame, so not cached
+    c1.plotly_chart(build_figure("int_good", df_int), use_container_width=True)
     c2.markdown("""
 **Why this works:**  
 Interactive controls let users explore data progressively—overview first, then drill down—enhancing understanding and engagement.
@@ -724,42 +525,19 @@ Shneiderman’s mantra guides modern dashboards; Segel & Heer advocate merging n
 - Balance author-led story with reader-driven discovery.
     """)
     if c2.checkbox("Show code: Good example (Interactive)", key="int_good_code"):
-        c2.code('''# Good Example Code: Interactive scatter
-import pandas as pd
-import plotly.express as px
-
-df_gap = pd.read_csv("data/gapminder_alcohol.csv")
-df_int = df_gap.copy()
-fig = px.scatter(
-    df_int, x="incomeperperson", y="alcconsumption",
-    hover_name="country"
-)
-fig.show()''', language="python")
+        c2.code(chart_code("int_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: Static Dump")
     c1, c2 = st.columns([2,1])
-    fign2 = px.scatter(df_int, x="incomeperperson", y="alcconsumption")
-    fign2.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    fign2.update_layout(
-        xaxis_title="Income per Person (USD)",
-        yaxis_title="Alcohol Consumption per Capita (L)"
-    )
-    fign2.update_layout(title="Static Scatter: Alcohol vs Income")
-    c1.plotly_chart(fign2, use_container_width=True)
+    c1.plotly_chart(build_figure("int_bad", df_int), use_container_width=True)
     c2.markdown("""
     **No interactivity**  
     - Viewers can’t explore.  
     - Static charts limit insight.
     """)
     if c2.checkbox("Show code: Bad example (Interactive)", key="int_bad_code"):
-        c2.code('''# Bad Example Code: Static scatter
-import pandas as pd
-import plotly.express as px
-
-df_gap = pd.read_csv("data/gapminder_alcohol.csv")
-fign2 = px.scatter(df_gap, x="incomeperperson", y="alcconsumption")
-fign2.show()''', language="python")
+        c2.code(chart_code("int_bad"), language="python")
 
     # Ugly
     st.subheader("💀 Ugly: Tool Overload")
@@ -786,22 +564,7 @@ with tabs[6]:
     # Good
     st.subheader("✅ Good: Layered Construction")
     c1, c2 = st.columns([2,1])
-    df_merge = pd.merge(df_coffee_cons, df_coffee_prod, on="country").dropna()
-    figp1 = px.scatter(
-        df_merge,
-        x="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-        y="CoffeeProducing_CoffeeProduction_tonnes_2022",
-        size="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-        color="CoffeeProducing_CoffeeYield_kgPerHa_2022",
-        color_continuous_scale="Viridis"
-    )
-    figp1.update_layout(margin=dict(l=0,r=0,t=30,b=0))
-    figp1.update_layout(
-        xaxis_title="Coffee Consumption per Capita (kg)",
-        yaxis_title="Coffee Production (tonnes)"
-    )
-    figp1.update_layout(title="Scatter: Coffee Consumption vs Production")
-    c1.plotly_chart(figp1, use_container_width=True)
+    c1.plotly_chart(figure_for("prep_good"), use_container_width=True)
     c2.markdown("""
 **Why this works:**  
 A layered grammar-of-graphics approach breaks down visuals into data, marks, and scales, enabling systematic, reproducible construction.
@@ -815,18 +578,7 @@ Hadley Wickham’s framework fosters transparency and modularity; Tufte’s emph
 - Document each step for reproducibility and auditability.
     """)
     if c2.checkbox("Show code: Good example (Grammar)", key="prep_good_code"):
-        c2.code('''# Good Example Code: Grammar of Graphics
-import pandas as pd
-import plotly.express as px
-
-df = pd.merge(df_coffee_cons, df_coffee_prod, on="country").dropna()
-fig = px.scatter(
-    df, x="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-    y="CoffeeProducing_CoffeeProduction_tonnes_2022",
-    size="CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022",
-    color="CoffeeProducing_CoffeeYield_kgPerHa_2022"
-)
-fig.show()''', language="python")
+        c2.code(chart_code("prep_good"), language="python")
 
     # Bad
     st.subheader("🚫 Bad: No Data Checks")
@@ -863,8 +615,185 @@ df = pd.read_csv("data/coffee-consumption-by-country-2025.csv")
 value = df["CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022"].values[0]
 print(value)''', language="python")
 
-# --- Conclusion ---
+    # Normalized views: population and continent joins are precomputed, so
+    # both charts are lookups into the rollup tables.
+    st.subheader("⚖️ Normalize Before You Compare")
+    c1, c2 = st.columns(2)
+    measure = c1.selectbox("Measure", list(MEASURES), key="norm_measure")
+    view = c2.radio(
+        "Show", ["kg per person", "Share of world (%)"], horizontal=True, key="norm_view"
+    )
+    metric = "kg_per_person" if view == "kg per person" else "share_of_world"
+
+    c1, c2 = st.columns([2,1])
+    df_norm = country_table(measure).reset_index()
+    fign1 = px.choropleth(
+        df_norm, locations="country", locationmode="country names", color=metric,
+        hover_data=["continent", "population"], color_continuous_scale="Viridis"
+    )
+    fign1.update_layout(margin=dict(l=0,r=0,t=30,b=0), title=f"{measure}: {view} (2022, population 2018)")
+    c1.plotly_chart(fign1, use_container_width=True)
+    c2.markdown("""
+    **Totals track population**  
+    - Raw totals mostly show where people live.  
+    - Per-person rates and shares make countries comparable.  
+    - Countries without a 2018 population are left blank.
+    """)
+
+    c1, c2 = st.columns([2,1])
+    df_cont = continent_table(measure).reset_index()
+    assigned = df_cont[df_cont["continent"] != UNASSIGNED]
+    fign2 = px.bar(assigned.sort_values(metric, ascending=False), x="continent", y=metric, hover_data=["countries"])
+    fign2.update_layout(margin=dict(l=0,r=0,t=30,b=0), xaxis_title="Continent", yaxis_title=view,
+                        title=f"{measure} by Continent: {view}")
+    c1.plotly_chart(fign2, use_container_width=True)
+    c2.markdown("""
+    **Roll up, then normalize**  
+    - Continent rates divide summed totals by summed population, not average country rates.  
+    """)
+    c2.caption(f"{assigned['countries'].sum()} of {len(df_norm)} countries assigned to a continent.")
+
+# --- Data Explorer ---
 with tabs[7]:
+    st.header("Data")
+    st.markdown("""
+    **Browse the raw tables.**  
+    Filter, sort and page through the datasets behind the charts. Queries run on the server and only the visible page is sent to the browser.
+    """)
+
+    c1, c2, c3, c4 = st.columns([2,2,1,1])
+    source = c1.selectbox("Dataset", list(EXPLORER_SOURCES), key="explore_source")
+    paths, build = EXPLORER_SOURCES[source]
+    table = table_for(source, paths, build)
+    sort_by = c2.selectbox("Sort by", ["(none)"] + table.columns, key="explore_sort")
+    ascending = c3.radio("Order", ["Asc", "Desc"], horizontal=True, key="explore_order") == "Asc"
+    page_size = c4.selectbox("Rows per page", [25, 50, 100], index=1, key="explore_page_size")
+
+    filters = {}
+    c1, c2 = st.columns([1,3])
+    filter_col = c1.selectbox("Filter column", ["(none)"] + table.columns, key="explore_filter_col")
+    if filter_col != "(none)":
+        if table.is_numeric(filter_col):
+            low, high = table.bounds(filter_col)
+            if low < high:
+                filters[filter_col] = c2.slider("Range", low, high, (low, high), key=f"explore_range_{source}_{filter_col}")
+        else:
+            filters[filter_col] = c2.text_input("Contains", key=f"explore_text_{source}_{filter_col}")
+
+    # back to the first page whenever the result set changes
+    query = (source, sort_by, ascending, page_size, tuple(sorted(filters.items())))
+    if st.session_state.get("explore_query") != query:
+        st.session_state["explore_query"] = query
+        st.session_state["explore_page"] = 1
+    sort_by = None if sort_by == "(none)" else sort_by
+    total = table.count(filters, sort_by, ascending)
+    pages = max(1, -(-total // page_size))
+    page = st.number_input(f"Page (of {pages})", 1, pages, key="explore_page")
+    offset = (page - 1) * page_size
+    rows, total = table.query(filters, sort_by, ascending, offset, page_size)
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    st.caption(f"Rows {min(offset + 1, total):,}–{offset + len(rows):,} of {total:,} matching ({len(table):,} total)")
+
+# --- Your Data ---
+with tabs[8]:
+    st.header("Your Data")
+    st.markdown("""
+    **Bring your own CSV.**  
+    Upload a file and run it through the same Good/Bad/Ugly templates. The file is read in chunks, so only the aggregates each chart needs are kept in memory—even for very large uploads.
+    """)
+
+    # Name of the file last read, cleared when the reader changes the upload,
+    # so an upload Streamlit no longer has is reported instead of the tab
+    # silently going blank.
+    upload = st.file_uploader(
+        "Upload a CSV", type="csv", key="upload",
+        on_change=lambda: st.session_state.pop("upload_name", None)
+    )
+    result = None
+    if upload is None and st.session_state.get("upload_name"):
+        st.info(f"{st.session_state.pop('upload_name')} is no longer available on the server. Please upload it again.")
+    if upload is not None:
+        upload_id = getattr(upload, "file_id", (upload.name, upload.size))
+        cached = SESSIONS.get("ingest")
+        if cached is None or cached[0] != upload_id:
+            bar = st.progress(0.0, text=f"Reading {upload.name}…")
+            try:
+                result = ingest_csv(
+                    upload,
+                    memory_ceiling=UPLOAD_MEMORY_CEILING,
+                    progress=lambda f: bar.progress(f, text=f"Reading {upload.name}… {f:.0%}"),
+                    queued=lambda waited: bar.progress(0.0, text=f"Queued behind other uploads… {waited:.0f}s")
+                )
+                cached = SESSIONS.put("ingest", (upload_id, result))
+                st.session_state["upload_name"] = upload.name
+            except pd.errors.EmptyDataError:
+                st.error(f"{upload.name} is empty.")
+            except (pd.errors.ParserError, UnicodeDecodeError) as e:
+                st.error(f"Couldn't read {upload.name} as CSV: {e}")
+            except IngestBusy:
+                st.error("The server is busy reading other uploads. Please try again in a minute.")
+            bar.empty()
+        else:
+            result = cached[1]
+
+    if result is not None:
+        st.caption(f"{result.rows:,} rows · {len(result.numeric_columns)} numeric / {len(result.label_columns)} text columns")
+        if result.truncated:
+            st.warning("Too many distinct labels to keep exactly; rankings show the largest labels only.")
+        if not result.label_columns or not result.numeric_columns:
+            st.info("The templates need at least one text column and one numeric column.")
+        else:
+            c1, c2 = st.columns(2)
+            label = c1.selectbox("Label column", result.label_columns, key="upload_label")
+            value = c2.selectbox("Value column", result.numeric_columns, key="upload_value")
+
+            # Good
+            st.subheader("✅ Good: Ranked Bars")
+            c1, c2 = st.columns([2,1])
+            df_top = result.top(label, value, n=10)
+            figu1 = px.bar(df_top, x=value, y=label, orientation="h")
+            figu1.update_layout(margin=dict(l=0,r=0,t=30,b=0), showlegend=False)
+            figu1.update_yaxes(autorange="reversed")
+            figu1.update_layout(title=f"Top 10 {label} by {value}")
+            c1.plotly_chart(figu1, use_container_width=True)
+            c2.markdown("""
+    **Position & length**  
+    - Sorted bars make ranking effortless.  
+    - One color, no decoration.
+    """)
+
+            # Bad
+            st.subheader("🚫 Bad: Pie for Ranking")
+            c1, c2 = st.columns([2,1])
+            figu2 = px.pie(result.top(label, value, n=15), values=value, names=label)
+            figu2.update_layout(margin=dict(l=0,r=0,t=30,b=0))
+            figu2.update_layout(title=f"Pie Chart: {value} by {label}")
+            c1.plotly_chart(figu2, use_container_width=True)
+            c2.markdown("""
+    **Angles/areas are imprecise**  
+    - Hard to order similar slices.  
+    - Bars are better for ranking.
+    """)
+
+            # Ugly
+            st.subheader("💀 Ugly: 3D Scatter")
+            c1, c2 = st.columns([2,1])
+            if len(result.numeric_columns) >= 3:
+                x, y, z = result.numeric_columns[:3]
+                figu3 = px.scatter_3d(result.sample.dropna(subset=[x, y, z]), x=x, y=y, z=z, hover_name=label)
+                figu3.update_layout(margin=dict(l=0,r=0,t=30,b=0))
+                figu3.update_layout(title=f"3D Scatter: {x}, {y}, {z}")
+                c1.plotly_chart(figu3, use_container_width=True)
+            else:
+                c1.write("Needs at least three numeric columns.")
+            c2.markdown("""
+    **3D on a flat screen**  
+    - Depth is guessed, not read.  
+    - Plotted from a uniform sample of the upload.
+    """)
+
+# --- Conclusion ---
+with tabs[9]:
     st.header("Conclusion")
     st.markdown("""
     In this tutorial, we've journeyed through the spectrum of data visualization—from exemplary **Good** practices, through instructive **Bad** pitfalls, to cautionary **Ugly** extremes. Key takeaways include:
@@ -878,4 +807,45 @@ with tabs[7]:
 
     By contrasting the best designs with common missteps, you now have a robust framework for creating visualizations that are not only beautiful, but, above all, honest and insightful.
     """)
-    st.markdown("> “A visualization should be truthful, functional, beautiful, insightful, and enlightening.” — Alberto Cairo")
\ No newline at end of file
+    st.markdown("> “A visualization should be truthful, functional, beautiful, insightful, and enlightening.” — Alberto Cairo")
+
+# --- Admin: cache observability ---
+if is_admin:
+    with tabs[10]:
+        st.header("Cache Admin")
+        c1, c2 = st.columns(2)
+        layer = c1.selectbox("Cache", [c.name for c in CACHES], key="admin_cache")
+        if c1.button("Clear cache", key="admin_clear_cache"):
+            next(c for c in CACHES if c.name == layer).clear()
+            c1.success(f"Cleared {layer}.")
+        deps = known_dependencies()
+        dataset = c2.selectbox("Dataset", deps, key="admin_dataset") if deps else None
+        if c2.button("Clear dataset dependents", key="admin_clear_deps", disabled=dataset is None):
+            c2.success(f"Dropped {clear_dependents(dataset)} entries derived from {dataset}.")
+
+        stats = pd.DataFrame(all_stats())
+        stats["MB"] = stats["bytes"] / 1024 / 1024
+        stats["budget MB"] = stats["max_bytes"] / 1024 / 1024
+        st.dataframe(
+            stats[["cache", "entries", "MB", "budget MB", "hits", "misses", "hit_ratio", "evictions", "oldest_age_s"]],
+            use_container_width=True, hide_index=True
+        )
+        if st.button("Write metrics now", key="admin_emit"):
+            emit_metrics(force=True)
+
+        st.subheader("Sessions")
+        sessions = pd.DataFrame(SESSIONS.stats(), columns=["session", "objects", "bytes", "state_bytes", "idle_s"])
+        st.caption(
+            f"{len(sessions)} sessions holding {SESSIONS.bytes / 1024 / 1024:.1f} MB of "
+            f"{SESSIONS.max_bytes / 1024 / 1024:.0f} MB · idle objects dropped after {SESSIONS.idle_s:.0f}s · "
+            f"{SESSIONS.evictions} evictions · widget state and uploads "
+            f"({sessions['state_bytes'].sum() / 1024 / 1024:.1f} MB) are Streamlit's and not evicted"
+        )
+        sessions["MB"] = sessions["bytes"] / 1024 / 1024
+        sessions["widget MB"] = sessions["state_bytes"] / 1024 / 1024
+        st.dataframe(sessions[["session", "objects", "MB", "widget MB", "idle_s"]], use_container_width=True, hide_index=True)
+
+# Same numbers as the admin tab, as JSON lines on the cache_metrics logger.
+emit_metrics()
+# Free what idle and disconnected sessions are still holding.
+SESSIONS.sweep(keep=session_id())
@@ -0,0 +1,205 @@
+"""Regenerate global_alcohol_bubble.html, the animated bubble chart on index.html.
+
+    python build_bubble_chart.py [--out global_alcohol_bubble.html] [--bundle basic|full] [--cdn]
+
+The chart is written by hand rather than with fig.write_html so that each
+year's frame carries only the values that change (x, y, size, colour,
+population) while the trace styling, country names and hover template are
+declared once. Numbers are rounded to the precision the chart can show.
+
+plotly.js is linked rather than inlined. The chart only uses scatter
+traces, so by default the page links plotly.js's partial "basic" bundle
+(about a fifth of the full one). The plotly package only ships the full
+bundle, so the basic one must be vendored next to the page first (download
+it from the URL in the error message); the build never fetches it and never
+quietly swaps in the full bundle. `--cdn` links the bundle from the plotly
+CDN instead, and `--bundle full` writes the full bundle from the plotly
+package. Bundle names carry the plotly.js version, so rebuilding after a
+plotly upgrade links a fresh bundle instead of a stale one.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.offline
+
+FINAL_DATA = "data/Final_Data.csv"
+WORLD_POP = "data/2018worldpop.csv"
+MAX_BUBBLE_PX = 60
+PLOTLY_CDN_URL = "https://cdn.plot.ly/{name}"
+
+X = "Alcohol_consumption_per_person_in_liter"
+BEVERAGES = [
+    "Beer_consumption_per_capita_in_liter",
+    "Wine_Consuption_per_capita_in_liter",
+    "Spirit_Consuption_per_capita_in_liter",
+]
+
+
+def load_data():
+    df = pd.read_csv(FINAL_DATA, encoding="latin-1")
+    df = df.loc[:, ~df.columns.str.startswith("Unnamed")]
+    # a few cells are padded with non-breaking spaces and parse as text
+    df[BEVERAGES] = df[BEVERAGES].apply(lambda c: pd.to_numeric(c.astype(str).str.strip(), errors="coerce"))
+    # 2018worldpop.csv is the repo's reference population for 2018
+    pop = pd.read_csv(WORLD_POP).set_index("Country")["Population"]
+    is_2018 = df["Year"] == 2018
+    df.loc[is_2018, "Population"] = df.loc[is_2018, "Country"].map(pop).fillna(df.loc[is_2018, "Population"])
+
+    df["deaths_per_100k"] = df["Death_due_to_alcohol"] / df["Population"] * 1e5
+    total = df[BEVERAGES].sum(axis=1, min_count=1)
+    df["spirits_share"] = df[BEVERAGES[2]] / total.replace(0, np.nan) * 100
+    return df
+
+
+def quantize(values, digits):
+    """Round for display and turn NaN into null; ints when digits == 0."""
+    rounded = np.round(np.asarray(values, dtype=float), digits)
+    if digits == 0:
+        return [None if np.isnan(v) else int(v) for v in rounded]
+    return [None if np.isnan(v) else float(v) for v in rounded]
+
+
+def build_figure(df):
+    countries = sorted(df["Country"].unique())
+    years = sorted(df["Year"].unique())
+    # same country order in every frame, so names live only on the base trace
+    wide = df.set_index(["Year", "Country"])
+    max_pop = df["Population"].max()
+
+    def frame_values(year):
+        rows = wide.loc[year].reindex(countries)
+        return {
+            "x": quantize(rows[X], 1),
+            "y": quantize(rows["deaths_per_100k"], 1),
+            "customdata": quantize(rows["Population"] / 1e6, 1),
+            "marker": {
+                "size": quantize(MAX_BUBBLE_PX * np.sqrt(rows["Population"] / max_pop), 1),
+                "color": quantize(rows["spirits_share"], 0),
+            },
+        }
+
+    frames = [{"name": str(y), "traces": [0], "data": [frame_values(y)]} for y in years]
+
+    base = frame_values(years[0])
+    base["marker"].update({
+        "sizemode": "diameter",
+        "sizemin": 2,
+        "colorscale": "Viridis",
+        "cmin": 0,
+        "cmax": 100,
+        "colorbar": {"title": {"text": "Spirits share (%)"}},
+        "line": {"width": 0.5, "color": "white"},
+        "opacity": 0.8,
+    })
+    base.update({
+        "type": "scatter",
+        "mode": "markers",
+        "hovertext": countries,
+        "hovertemplate": (
+            "<b>%{hovertext}</b><br>Alcohol: %{x} L per person<br>"
+            "Alcohol deaths: %{y} per 100k<br>Population: %{customdata}M<extra></extra>"
+        ),
+    })
+
+    steps = [{
+        "label": str(y),
+        "method": "animate",
+        "args": [[str(y)], {"mode": "immediate", "frame": {"duration": 500, "redraw": False},
+                            "transition": {"duration": 300}}],
+    } for y in years]
+    layout = {
+        "title": {"text": "Alcohol Consumption vs Alcohol-Attributed Deaths (bubble = population)"},
+        "xaxis": {"title": {"text": "Alcohol consumption per person (L)"},
+                  "range": [-0.5, float(np.ceil(df[X].max())) + 0.5]},
+        "yaxis": {"title": {"text": "Deaths due to alcohol per 100k"},
+                  "range": [-2, float(np.ceil(df["deaths_per_100k"].max() / 10) * 10)]},
+        "hovermode": "closest",
+        "margin": {"l": 60, "r": 20, "t": 50, "b": 40},
+        "sliders": [{"active": 0, "currentvalue": {"prefix": "Year: "}, "pad": {"t": 50}, "steps": steps}],
+        "updatemenus": [{
+            "type": "buttons",
+            "direction": "left",
+            "x": 0.1, "y": 0, "xanchor": "right", "yanchor": "top",
+            "pad": {"r": 10, "t": 70},
+            "buttons": [
+                {"label": "&#9654;", "method": "animate",
+                 "args": [None, {"frame": {"duration": 500, "redraw": False}, "fromcurrent": True,
+                                 "transition": {"duration": 300}}]},
+                {"label": "&#9724;", "method": "animate",
+                 "args": [[None], {"frame": {"duration": 0, "redraw": False}, "mode": "immediate"}]},
+            ],
+        }],
+    }
+    return {"data": [base], "layout": layout, "frames": frames}
+
+
+def render_html(fig, plotlyjs_src):
+    payload = json.dumps(fig, separators=(",", ":"), allow_nan=False).replace("</", "<\\/")
+    return f"""<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8" /></head>
+<body style="margin:0">
+<div id="chart" style="width:100%;height:100vh"></div>
+<script src="{plotlyjs_src}"></script>
+<script>
+const fig = {payload};
+Plotly.newPlot("chart", fig.data, fig.layout, {{responsive: true}})
+  .then(() => Plotly.addFrames("chart", fig.frames));
+</script>
+</body>
+</html>
+"""
+
+
+def bundle_name(bundle):
+    version = plotly.offline.get_plotlyjs_version()
+    return f"plotly-basic-{version}.min.js" if bundle == "basic" else f"plotly-{version}.min.js"
+
+
+def write_plotlyjs(out_dir, bundle="basic"):
+    """Make sure the plotly.js bundle matching the installed plotly is in
+    `out_dir` and return its file name."""
+    name = bundle_name(bundle)
+    path = os.path.join(out_dir, name)
+    if os.path.exists(path):
+        return name
+    if bundle == "basic":
+        raise SystemExit(
+            f"{name} is not vendored in {out_dir}. Download {PLOTLY_CDN_URL.format(name=name)} "
+            "there, pass --cdn to link it from the CDN, or pass --bundle full."
+        )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the landing-page bubble chart.")
+    parser.add_argument("--out", default="global_alcohol_bubble.html")
+    parser.add_argument("--bundle", choices=["basic", "full"], default="basic",
+                        help="plotly.js bundle to link (basic covers scatter traces)")
+    parser.add_argument("--cdn", action="store_true", help="link the bundle from the plotly CDN")
+    args = parser.parse_args()
+
+    out_dir = os.path.dirname(os.path.abspath(args.out))
+    if args.cdn:
+        js_src = PLOTLY_CDN_URL.format(name=bundle_name(args.bundle))
+    else:
+        js_src = write_plotlyjs(out_dir, args.bundle)
+    html = render_html(build_figure(load_data()), js_src)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write(html)
+
+    print(f"{args.out}: {os.path.getsize(args.out) / 1024:.1f} KB")
+    if args.cdn:
+        print(f"{js_src} (linked, cached separately)")
+    else:
+        js_path = os.path.join(out_dir, js_src)
+        print(f"{js_src}: {os.path.getsize(js_path) / 1024:.1f} KB (linked, cached separately)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+# --- Size estimation ---
+def approx_bytes(value):
+    """Rough retained size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(getattr(value, "nbytes", None), int):
+        return value.nbytes
+    if isinstance(value, io.IOBase) and isinstance(getattr(value, "size", None), int):
+        # Streamlit's UploadedFile; getbuffer() would copy the shared bytes
+        return value.size
+    if hasattr(value, "to_plotly_json"):
+        return len(value.to_json())
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(approx_bytes(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(approx_bytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+# --- Dataset versions ---
+def file_version(path):
+    """Cheap version token for a file on disk (changes when the file is rewritten)."""
+    st = os.stat(path)
+    return f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+_digests = {}
+
+
+def file_digest(path):
+    """Content hash of a file, recomputed only when its file_version changes."""
+    version = file_version(path)
+    if _digests.get(path, (None,))[0] != version:
+        with open(path, "rb") as f:
+            _digests[path] = (version, hashlib.file_digest(f, "sha1").hexdigest()[:16])
+    return _digests[path][1]
+
+
+def frame_version(df):
+    """Content hash of a DataFrame, stable across processes and reruns."""
+    h = hashlib.sha1()
+    h.update(",".join(map(str, df.columns)).encode())
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()[:16]
+
+
+# --- Bounded LRU cache ---
+# Every cache registers itself here so the admin tab and metrics can see it.
+CACHES = []
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and (optionally) bytes.
+
+    Lives at module level so entries survive Streamlit reruns and are shared
+    between sessions of the same worker. Entries can be tagged with the
+    dataset paths they were derived from (`deps`) so that everything built
+    from one dataset can be dropped together.
+    """
+
+    def __init__(self, name, max_entries=128, max_bytes=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._born = {}
+        self._deps = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES.append(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, deps=()):
+        size = approx_bytes(value)
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._born[key] = time.monotonic()
+            self._deps[key] = frozenset(deps)
+            self.bytes += size
+            self._evict()
+        return value
+
+    def get_or_set(self, key, build, deps=()):
+        """Return the cached value for `key`, calling `build()` on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = self.put(key, build(), deps)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self._born.clear()
+            self._deps.clear()
+            self.bytes = 0
+
+    def clear_dependents(self, dep):
+        """Drop every entry tagged with `dep`; returns how many were dropped."""
+        with self._lock:
+            keys = [k for k, deps in self._deps.items() if dep in deps]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            oldest = min(self._born.values(), default=None)
+            return {
+                "cache": self.name,
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "oldest_age_s": time.monotonic() - oldest if oldest is not None else None,
+            }
+
+    def _drop(self, key):
+        del self._data[key]
+        self.bytes -= self._sizes.pop(key)
+        del self._born[key]
+        del self._deps[key]
+
+    def _evict(self):
+        # keep the newest entry even if it alone exceeds the byte budget
+        while len(self._data) > 1 and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+
+def all_stats():
+    return [c.stats() for c in CACHES]
+
+
+def clear_dependents(dep):
+    """Drop everything derived from dataset `dep` from every cache."""
+    return sum(c.clear_dependents(dep) for c in CACHES)
+
+
+def known_dependencies():
+    deps = set()
+    for c in CACHES:
+        with c._lock:
+            for d in c._deps.values():
+                deps |= d
+    return sorted(deps)
+
+
+# --- Metrics ---
+METRICS_INTERVAL = float(os.environ.get("CACHE_METRICS_INTERVAL_S", "60"))
+_metrics_log = logging.getLogger("cache_metrics")
+if not _metrics_log.handlers:
+    _metrics_log.addHandler(logging.StreamHandler())
+    _metrics_log.setLevel(logging.INFO)
+    _metrics_log.propagate = False
+_last_emit = 0.0
+
+
+def emit_metrics(force=False):
+    """Log one JSON line per cache, at most every METRICS_INTERVAL seconds."""
+    global _last_emit
+    now = time.monotonic()
+    if not force and now - _last_emit < METRICS_INTERVAL:
+        return
+    _last_emit = now
+    for stats in all_stats():
+        _metrics_log.info(json.dumps(stats))
@@ -0,0 +1,429 @@
+"""Declarative chart specs: one definition per example chart.
+
+Each spec names a dataset, the pandas transforms applied to it, a Plotly
+Express mark with its encodings, and trace/layout/axis updates. The same
+spec builds the live figure, renders the "Show code" snippet and yields a
+stable hash used as the figure's cache key, so the three can't drift apart.
+
+Run `python chart_specs.py --out prebuilt` to pre-build every figure as
+Plotly JSON, plus a PNG preview of each, without running the Streamlit app;
+the app picks those files up from PREBUILT_DIR when their hash matches.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import os
+
+import pandas as pd
+import plotly
+import plotly.express as px
+import plotly.io as pio
+
+from cache import file_digest
+from datasets import load_csv
+from figures import FIGURE_CACHE, build_figures
+from previews import export_png, preview_path
+from sampling import MAX_SCATTER_POINTS, cap_points
+
+PREBUILT_DIR = os.environ.get("PREBUILT_FIGURES_DIR", "prebuilt")
+
+# --- Datasets ---
+DATASETS = {
+    "coffee_cons": {"path": "data/coffee-consumption-by-country-2025.csv"},
+    "coffee_prod": {"path": "data/coffee-producing-countries-2025.csv"},
+    "gapminder": {"path": "data/gapminder_alcohol.csv"},
+    "coffee_merged": {"merge": ["coffee_cons", "coffee_prod"], "on": "country"},
+    "symbols": {"records": {"A": [10], "B": [20]}},
+}
+
+CONS = "CoffeConsumption_ConsumptionPerCapita_KgPerCapita_2022"
+PROD = "CoffeeProducing_CoffeeProduction_tonnes_2022"
+YIELD = "CoffeeProducing_CoffeeYield_kgPerHa_2022"
+GAP_COLS = ["alcconsumption", "incomeperperson", "suicideper100th", "urbanrate"]
+MARGIN = {"l": 0, "r": 0, "t": 30, "b": 0}
+
+# --- Specs ---
+SPECS = {
+    "design_good": {
+        "comment": "Good Example Code",
+        "data": "coffee_cons",
+        "transform": [
+            {"op": "sort_values", "args": [CONS], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [10]},
+        ],
+        "mark": "bar",
+        "encoding": {"x": CONS, "y": "country", "orientation": "h", "color_discrete_sequence": ["white"]},
+        "traces": {"marker_line_width": 0, "hovertemplate": "%{x} kg <extra></extra>"},
+        "layout": {
+            "xaxis_title": "Coffee Consumption per Capita (2022) kg",
+            "yaxis_title": "Country",
+            "showlegend": False,
+            "margin": MARGIN,
+            "plot_bgcolor": "rgba(0,0,0,0)",
+            "title": "High Data-Ink Ratio: Coffee Consumption per Capita (kg)",
+        },
+        # largest bar on top
+        "yaxes": {"autorange": "reversed"},
+    },
+    "color_good": {
+        "comment": "Good Example Code: Accessible Palette",
+        "data": "coffee_prod",
+        "transform": [
+            {"op": "sort_values", "args": [PROD], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [15]},
+        ],
+        "mark": "choropleth",
+        "encoding": {
+            "locations": "country",
+            "locationmode": "country names",
+            "color": PROD,
+            "color_continuous_scale": "Viridis",
+        },
+        "layout": {"margin": MARGIN, "title": "Accessible Palette: Coffee Production by Country"},
+    },
+    "color_bad": {
+        "comment": "Bad Example Code: Rainbow Palette",
+        "data": "coffee_prod",
+        "transform": [
+            {"op": "sort_values", "args": [PROD], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [15]},
+        ],
+        "mark": "choropleth",
+        "encoding": {
+            "locations": "country",
+            "locationmode": "country names",
+            "color": PROD,
+            "color_continuous_scale": "Rainbow",
+        },
+        "layout": {"margin": MARGIN, "title": "Rainbow Palette: Coffee Production by Country"},
+    },
+    "color_ugly": {
+        "comment": "Ugly Example Code: Overloaded Pie",
+        "data": "coffee_prod",
+        "transform": [
+            {"op": "sort_values", "args": [PROD], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [15]},
+        ],
+        "mark": "pie",
+        "encoding": {"values": PROD, "names": "country"},
+        "traces": {"textinfo": "none"},
+        "layout": {"margin": MARGIN, "title": "Overloaded Pie: Coffee Production by Country"},
+    },
+    "enc_good": {
+        "comment": "Good Example Code: Bar encoding",
+        "data": "coffee_cons",
+        "transform": [
+            {"op": "sort_values", "args": [CONS], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [10]},
+        ],
+        "mark": "bar",
+        "encoding": {"x": "country", "y": CONS},
+        "traces": {"hovertemplate": "%{y}<extra></extra>"},
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Country",
+            "yaxis_title": "Coffee Consumption per Capita (kg)",
+            "title": "Position & Length: Coffee Consumption per Capita by Country",
+        },
+    },
+    "enc_bad": {
+        "comment": "Bad Example Code: Pie encoding",
+        "data": "coffee_cons",
+        "transform": [
+            {"op": "sort_values", "args": [CONS], "kwargs": {"ascending": False}},
+            {"op": "head", "args": [10]},
+        ],
+        "mark": "pie",
+        "encoding": {"values": CONS, "names": "country"},
+        "layout": {"margin": MARGIN, "title": "Pie Chart: Coffee Consumption per Capita by Country"},
+    },
+    "enc_ugly": {
+        "comment": "Ugly Example Code: Mis-scaled symbols",
+        "data": "symbols",
+        "mark": "scatter",
+        "encoding": {"x": "A", "y": "B", "size": "B", "size_max": 60},
+        "layout": {"margin": MARGIN, "title": "Mis-scaled Symbols: Encoding Pitfall"},
+    },
+    "multi_good": {
+        "comment": "Good Example Code: Bubble chart",
+        "data": "gapminder",
+        "transform": [{"op": "dropna", "kwargs": {"subset": GAP_COLS}}],
+        "mark": "scatter",
+        "encoding": {
+            "x": "incomeperperson",
+            "y": "alcconsumption",
+            "size": "suicideper100th",
+            "color": "urbanrate",
+            "hover_name": "country",
+            "size_max": 40,
+            "log_x": True,
+            "color_continuous_scale": "Viridis",
+        },
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Income per Person (USD)",
+            "yaxis_title": "Alcohol Consumption per Capita (L)",
+            "title": "Bubble Chart: Alcohol vs Income vs Urbanization vs Suicide",
+        },
+    },
+    "multi_bad": {
+        "comment": "Bad Example Code: Overcrowded scatter",
+        "data": "gapminder",
+        "mark": "scatter",
+        "encoding": {"x": "incomeperperson", "y": "alcconsumption"},
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Income per Person (USD)",
+            "yaxis_title": "Alcohol Consumption per Capita (L)",
+            "title": "Overcrowded Scatter: Income vs Alcohol",
+        },
+        # serving-only cap on rendered points; not part of the snippet
+        "max_points": MAX_SCATTER_POINTS,
+    },
+    "multi_ugly": {
+        "comment": "Ugly Example Code: 3D scatter",
+        "data": "gapminder",
+        "transform": [{"op": "dropna", "kwargs": {"subset": GAP_COLS}}],
+        "mark": "scatter_3d",
+        "encoding": {
+            "x": "incomeperperson",
+            "y": "alcconsumption",
+            "z": "suicideper100th",
+            "color": "urbanrate",
+            "size": "urbanrate",
+            "size_max": 20,
+        },
+        "layout": {
+            "margin": MARGIN,
+            "scene": {
+                "xaxis_title": "Income per Person (USD)",
+                "yaxis_title": "Alcohol Consumption per Capita (L)",
+                "zaxis_title": "Suicide Rate per 100k",
+            },
+            "title": "3D Scatter: Income, Alcohol, and Suicide",
+        },
+    },
+    "int_good": {
+        "comment": "Good Example Code: Interactive scatter",
+        "data": "gapminder",
+        "mark": "scatter",
+        "encoding": {"x": "incomeperperson", "y": "alcconsumption", "hover_name": "country"},
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Income per Person (USD)",
+            "yaxis_title": "Alcohol Consumption per Capita (L)",
+            "title": "Interactive Scatter: Alcohol vs Income",
+        },
+    },
+    "int_bad": {
+        "comment": "Bad Example Code: Static scatter",
+        "data": "gapminder",
+        "mark": "scatter",
+        "encoding": {"x": "incomeperperson", "y": "alcconsumption"},
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Income per Person (USD)",
+            "yaxis_title": "Alcohol Consumption per Capita (L)",
+            "title": "Static Scatter: Alcohol vs Income",
+        },
+    },
+    "prep_good": {
+        "comment": "Good Example Code: Grammar of Graphics",
+        "data": "coffee_merged",
+        "transform": [{"op": "dropna"}],
+        "mark": "scatter",
+        "encoding": {
+            "x": CONS,
+            "y": PROD,
+            "size": CONS,
+            "color": YIELD,
+            "color_continuous_scale": "Viridis",
+        },
+        "layout": {
+            "margin": MARGIN,
+            "xaxis_title": "Coffee Consumption per Capita (kg)",
+            "yaxis_title": "Coffee Production (tonnes)",
+            "title": "Scatter: Coffee Consumption vs Production",
+        },
+    },
+}
+
+
+# --- Data ---
+def source_paths(dataset):
+    ds = DATASETS[dataset]
+    if "path" in ds:
+        return (ds["path"],)
+    if "merge" in ds:
+        return tuple(p for name in ds["merge"] for p in source_paths(name))
+    return ()
+
+
+def load_dataset(dataset):
+    ds = DATASETS[dataset]
+    if "path" in ds:
+        return load_csv(ds["path"])
+    if "merge" in ds:
+        left, right = (load_dataset(name) for name in ds["merge"])
+        return pd.merge(left, right, on=ds["on"])
+    return pd.DataFrame(ds["records"])
+
+
+def spec_frame(name, data=None):
+    """The spec's dataset after its transforms. `data` overrides the source
+    (e.g. a frame already filtered by a widget)."""
+    spec = SPECS[name]
+    df = load_dataset(spec["data"]) if data is None else data
+    for step in spec.get("transform", []):
+        df = getattr(df, step["op"])(*step.get("args", []), **step.get("kwargs", {}))
+    if "max_points" in spec:
+        # the spec hash identifies the transformed source frame; a caller's
+        # `data` is hashed instead (callers pass frames already capped)
+        version = spec_hash(name) if data is None else None
+        df = cap_points(df, spec["max_points"], version=version, deps=source_paths(spec["data"]))
+    return df
+
+
+# --- Figures ---
+def build_figure(name, data=None):
+    spec = SPECS[name]
+    fig = getattr(px, spec["mark"])(spec_frame(name, data), **spec["encoding"])
+    if "traces" in spec:
+        fig.update_traces(**spec["traces"])
+    if "layout" in spec:
+        fig.update_layout(**spec["layout"])
+    if "xaxes" in spec:
+        fig.update_xaxes(**spec["xaxes"])
+    if "yaxes" in spec:
+        fig.update_yaxes(**spec["yaxes"])
+    return fig
+
+
+def spec_hash(name):
+    """Changes whenever the spec, its source data or plotly's version do.
+
+    Uses file contents rather than mtimes so hashes computed by `prebuild`
+    still match after the files are copied or checked out elsewhere.
+    """
+    payload = json.dumps(
+        [SPECS[name], DATASETS[SPECS[name]["data"]], plotly.__version__], sort_keys=True
+    )
+    versions = "|".join(file_digest(p) for p in source_paths(SPECS[name]["data"]))
+    return hashlib.sha1((payload + versions).encode()).hexdigest()[:16]
+
+
+def _prebuilt_path(name, version, out_dir=PREBUILT_DIR):
+    return os.path.join(out_dir, f"{name}.{version}.json")
+
+
+def _load_or_build(name, version):
+    path = _prebuilt_path(name, version)
+    if os.path.exists(path):
+        return pio.read_json(path)
+    return build_figure(name)
+
+
+def figure_for(name):
+    """Figure for spec `name`, memoized by spec hash."""
+    version = spec_hash(name)
+    return FIGURE_CACHE.get_or_set(
+        (name, version), lambda: _load_or_build(name, version), deps=source_paths(SPECS[name]["data"])
+    )
+
+
+def build_specs(names, on_ready):
+    """Build the named specs, memoized by spec hash, handing each to `on_ready`."""
+    versions = {name: spec_hash(name) for name in names}
+    build_figures(
+        {name: functools.partial(_load_or_build, name, versions[name]) for name in names},
+        on_ready,
+        versions=versions,
+        deps={name: source_paths(SPECS[name]["data"]) for name in names},
+    )
+
+
+# --- Code snippets ---
+def _py(value):
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, dict):
+        if all(isinstance(k, str) and k.isidentifier() for k in value):
+            return "dict(" + ", ".join(f"{k}={_py(v)}" for k, v in value.items()) + ")"
+        return "{" + ", ".join(f"{_py(k)}: {_py(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, list):
+        return "[" + ", ".join(_py(v) for v in value) + "]"
+    return repr(value)
+
+
+def _call(args=(), kwargs=None, indent=None, lead=None):
+    parts = ([lead] if lead else []) + [_py(a) for a in args]
+    parts += [f"{k}={_py(v)}" for k, v in (kwargs or {}).items()]
+    if indent is None:
+        return "(" + ", ".join(parts) + ")"
+    pad = " " * indent
+    return "(\n" + ",\n".join(pad + p for p in parts) + "\n)"
+
+
+def _load_code(dataset):
+    ds = DATASETS[dataset]
+    if "path" in ds:
+        return f"pd.read_csv({_py(ds['path'])})"
+    if "merge" in ds:
+        left, right = (_load_code(name) for name in ds["merge"])
+        return f"pd.merge(\n    {left},\n    {right},\n    on={_py(ds['on'])}\n)"
+    return f"pd.DataFrame({_py(ds['records'])})"
+
+
+def chart_code(name):
+    """Python snippet that reproduces the figure built from spec `name`."""
+    spec = SPECS[name]
+    lines = [
+        f"# {spec['comment']}",
+        "import pandas as pd",
+        "import plotly.express as px",
+        "",
+        f"df = {_load_code(spec['data'])}",
+    ]
+    for step in spec.get("transform", []):
+        lines.append(f"df = df.{step['op']}{_call(step.get('args', []), step.get('kwargs'))}")
+    lines.append("")
+    lines.append(f"fig = px.{spec['mark']}" + _call(kwargs=spec["encoding"], indent=4, lead="df"))
+    for key, method in [("traces", "update_traces"), ("layout", "update_layout"),
+                        ("xaxes", "update_xaxes"), ("yaxes", "update_yaxes")]:
+        if key in spec:
+            lines.append(f"fig.{method}" + _call(kwargs=spec[key], indent=4 if len(spec[key]) > 2 else None))
+    lines.append("fig.show()")
+    return "\n".join(lines)
+
+
+# --- Batch pre-build ---
+def prebuild(out_dir=PREBUILT_DIR, images=True):
+    """Write every spec's figure as Plotly JSON named by its hash.
+
+    With `images`, also export each figure's static preview (needs kaleido
+    and Chrome) under the same hash, which is what the app looks up.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name in SPECS:
+        version = spec_hash(name)
+        fig = build_figure(name)
+        path = _prebuilt_path(name, version, out_dir)
+        fig.write_json(path)
+        written.append(path)
+        if images:
+            png_path = preview_path(version, out_dir)
+            with open(png_path, "wb") as f:
+                f.write(export_png(fig))
+            written.append(png_path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-build all chart specs as Plotly JSON.")
+    parser.add_argument("--out", default=PREBUILT_DIR)
+    parser.add_argument("--no-images", action="store_true", help="skip the PNG previews (no Chrome needed)")
+    args = parser.parse_args()
+    for path in prebuild(args.out, images=not args.no_images):
+        print(path)
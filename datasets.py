@@ -0,0 +1,13 @@
+import pandas as pd
+
+from cache import LRUCache, file_version
+
+# Parsed CSVs, keyed by path and file version so an edited file is re-read.
+# Callers share the cached frame: never modify it in place.
+DATASET_CACHE = LRUCache("datasets", max_entries=32, max_bytes=512 * 1024 * 1024)
+
+
+def load_csv(path, **read_kw):
+    """pd.read_csv, memoized across reruns and sessions."""
+    key = (path, file_version(path), repr(sorted(read_kw.items())))
+    return DATASET_CACHE.get_or_set(key, lambda: pd.read_csv(path, **read_kw), deps=(path,))
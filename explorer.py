@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, file_version, frame_version
+
+# Filtered+sorted row positions per query, and the rendered pages on top of
+# them; paging through one result set only slices the cached positions.
+MATCH_CACHE = LRUCache("explorer matches", max_entries=64, max_bytes=64 * 1024 * 1024)
+PAGE_CACHE = LRUCache("explorer pages", max_entries=256, max_bytes=32 * 1024 * 1024)
+TABLE_CACHE = LRUCache("explorer tables", max_entries=8, max_bytes=512 * 1024 * 1024)
+
+
+def table_for(name, paths, build):
+    """Indexed Table for a named dataset, rebuilt only when a source file changes."""
+    key = (name, tuple(file_version(p) for p in paths))
+    return TABLE_CACHE.get_or_set(key, lambda: Table(build(), deps=paths), deps=paths)
+
+
+class Table:
+    """Column-typed table with per-column sort orders, for server-side paging.
+
+    Text columns with repeated values are stored as categoricals so filters
+    run on the (small) category list instead of every row.
+    """
+
+    def __init__(self, df, deps=()):
+        self.deps = tuple(deps)
+        df = df.loc[:, [c for c in df.columns if not str(c).startswith("Unnamed:")]]
+        self.df = pd.DataFrame({c: _typed(df[c]) for c in df.columns}).reset_index(drop=True)
+        self.version = frame_version(self.df)
+        # ascending order of each column with missing values last, plus the
+        # number of non-missing values so a descending order can keep them last
+        self._orders = {}
+        # (min, max) of each numeric column, for range sliders and for telling
+        # whether a range filter restricts anything
+        self._bounds = {}
+        for c in self.df.columns:
+            col = self.df[c]
+            self._orders[c] = (
+                col.sort_values(kind="stable", na_position="last").index.to_numpy(),
+                int(col.notna().sum()),
+            )
+            if self.is_numeric(c):
+                self._bounds[c] = (float(col.min()), float(col.max()))
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def nbytes(self):
+        return int(self.df.memory_usage(deep=True).sum()) + sum(o.nbytes for o, _ in self._orders.values())
+
+    @property
+    def columns(self):
+        return list(self.df.columns)
+
+    def is_numeric(self, column):
+        return pd.api.types.is_numeric_dtype(self.df[column])
+
+    def bounds(self, column):
+        return self._bounds[column]
+
+    def query(self, filters=None, sort_by=None, ascending=True, offset=0, limit=50):
+        """Return (page, total) for the visible rows only.
+
+        `filters` maps a column to either a (low, high) range for numeric
+        columns or a substring for text columns. A range covering the whole
+        column and an empty substring are ignored, so they keep rows with
+        missing values.
+        """
+        filters = self._normalize(filters)
+        page_key = (self.version, filters, sort_by, ascending, offset, limit)
+
+        def build():
+            positions = self._matches(filters, sort_by, ascending)
+            return self.df.iloc[positions[offset:offset + limit]], len(positions)
+
+        return PAGE_CACHE.get_or_set(page_key, build, deps=self.deps)
+
+    def count(self, filters=None, sort_by=None, ascending=True):
+        """Number of rows `query` would page through, from the same cached matches."""
+        return len(self._matches(self._normalize(filters), sort_by, ascending))
+
+    def _normalize(self, filters):
+        return tuple(sorted(
+            (column, cond) for column, cond in (filters or {}).items() if self._restricts(column, cond)
+        ))
+
+    def _matches(self, filters, sort_by, ascending):
+        key = (self.version, filters, sort_by, ascending)
+        return MATCH_CACHE.get_or_set(
+            key, lambda: self._compute_matches(filters, sort_by, ascending), deps=self.deps
+        )
+
+    def _compute_matches(self, filters, sort_by, ascending):
+        mask = np.ones(len(self.df), dtype=bool)
+        for column, cond in filters:
+            mask &= self._mask(column, cond)
+        if sort_by is None:
+            return np.flatnonzero(mask)
+        order, valid = self._orders[sort_by]
+        if not ascending:
+            order = np.concatenate([order[:valid][::-1], order[valid:]])
+        return order[mask[order]]
+
+    def _restricts(self, column, cond):
+        if isinstance(cond, tuple):
+            low, high = self.bounds(column)
+            return cond[0] > low or cond[1] < high
+        return bool(cond)
+
+    def _mask(self, column, cond):
+        col = self.df[column]
+        if isinstance(cond, tuple):
+            low, high = cond
+            return col.between(low, high).to_numpy()
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            hit = col.cat.categories.str.contains(cond, case=False, regex=False)
+            return np.isin(col.cat.codes.to_numpy(), np.flatnonzero(hit))
+        return col.str.contains(cond, case=False, regex=False, na=False).to_numpy()
+
+
+def _typed(col):
+    if pd.api.types.is_numeric_dtype(col):
+        return col
+    numeric = pd.to_numeric(col, errors="coerce")
+    if numeric.notna().sum() >= 0.95 * col.notna().sum() > 0:
+        return numeric
+    col = col.astype("string")
+    if col.nunique() <= len(col) // 2:
+        return col.astype("category")
+    return col
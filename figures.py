@@ -0,0 +1,31 @@
+from cache import LRUCache
+
+# Built figures keyed by (chart name, data version). Cached figures are
+# shared between sessions, so renderers must not modify them.
+FIGURE_CACHE = LRUCache("figures", max_entries=128, max_bytes=128 * 1024 * 1024)
+
+
+def build_figures(builds, on_ready, versions=None, deps=None):
+    """Build a section's figures and hand each over as soon as it is ready.
+
+    `builds` maps a chart name to a zero-argument callable returning the
+    figure. `on_ready(name, fig)` may write into a placeholder laid out
+    earlier with `st.empty()`, so the section's text renders before any
+    chart is built.
+
+    Figures are built one after another on the script thread, so a cold
+    section still takes the sum of its charts, not the slowest one: px
+    figure building holds the GIL, so a thread pool gave no speedup, and a
+    process pool cost more in pickling than it saved. What makes sections
+    fast is not building at all — with `versions` (name -> a token that
+    changes whenever that chart's inputs do), figures are memoized in
+    FIGURE_CACHE, tagged with `deps` (name -> source paths), and only
+    missing ones are built.
+    """
+    deps = deps or {}
+    for name, build in builds.items():
+        if versions is None:
+            on_ready(name, build())
+            continue
+        key = (name, versions[name])
+        on_ready(name, FIGURE_CACHE.get_or_set(key, build, deps.get(name, ())))
@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache import approx_bytes
+from sampling import reservoir_sample
+
+# --- Limits ---
+DEFAULT_MEMORY_CEILING = 64 * 1024 * 1024  # bytes per ingest, chunk + aggregates
+SCHEMA_ROWS = 1000                         # rows read to infer the schema
+SAMPLE_ROWS = 5000                         # reservoir kept for scatter templates
+TOP_LABELS = 15                            # templates show at most this many labels
+
+# Only a couple of uploads are parsed at once per worker, so a burst of
+# large files queues up instead of stacking their chunk buffers. A queued
+# upload gives up after QUEUE_TIMEOUT_S instead of holding its session forever.
+MAX_CONCURRENT_INGESTS = 2
+QUEUE_TIMEOUT_S = float(os.environ.get("INGEST_QUEUE_TIMEOUT_S", "300"))
+QUEUE_POLL_S = 1.0
+_INGEST_SLOTS = threading.BoundedSemaphore(MAX_CONCURRENT_INGESTS)
+
+
+class IngestBusy(RuntimeError):
+    """Raised when no ingest slot frees up within QUEUE_TIMEOUT_S."""
+
+
+class IngestResult:
+    """Aggregates of an uploaded CSV, small enough to keep in session state."""
+
+    def __init__(self, schema, rows, totals, by_label, sample, truncated):
+        self.schema = schema          # column -> "numeric" | "text"
+        self.rows = rows
+        self.totals = totals          # DataFrame: count/sum/min/max/mean per numeric column
+        self.by_label = by_label      # {label column: DataFrame of per-label sum/count}
+        self.sample = sample          # reservoir sample of whole rows
+        self.truncated = truncated    # True if a label table hit the memory ceiling
+
+    @property
+    def nbytes(self):
+        frames = [self.totals, self.sample, *self.by_label.values()]
+        return sum(approx_bytes(f) for f in frames if f is not None)
+
+    @property
+    def numeric_columns(self):
+        return [c for c, kind in self.schema.items() if kind == "numeric"]
+
+    @property
+    def label_columns(self):
+        return [c for c, kind in self.schema.items() if kind == "text"]
+
+    def top(self, label, value, n=10):
+        """Top-`n` labels by summed `value`, as the bar/pie templates expect."""
+        table = self.by_label[label][value].sort_values(ascending=False).head(n)
+        return table.rename_axis(label).reset_index()
+
+
+def infer_schema(chunk):
+    """Classify each column of the first chunk as numeric or text."""
+    schema = {}
+    for col in chunk.columns:
+        if str(col).startswith("Unnamed:") and chunk[col].isna().all():
+            continue
+        converted = pd.to_numeric(chunk[col], errors="coerce")
+        # treat a column as numeric when nearly all non-empty cells parse
+        present = chunk[col].notna().sum()
+        if present and converted.notna().sum() >= 0.95 * present:
+            schema[col] = "numeric"
+        else:
+            schema[col] = "text"
+    return schema
+
+
+def _coerce(chunk, schema):
+    return pd.DataFrame({
+        col: pd.to_numeric(chunk[col], errors="coerce") if kind == "numeric"
+        else chunk[col].astype("string")
+        for col, kind in schema.items()
+    })
+
+
+def _merge_totals(acc, chunk, numeric):
+    part = pd.DataFrame({
+        "count": chunk[numeric].count(),
+        "sum": chunk[numeric].sum(),
+        "min": chunk[numeric].min(),
+        "max": chunk[numeric].max(),
+    })
+    if acc is None:
+        return part
+    return pd.DataFrame({
+        "count": acc["count"] + part["count"],
+        "sum": acc["sum"] + part["sum"],
+        "min": np.fmin(acc["min"], part["min"]),
+        "max": np.fmax(acc["max"], part["max"]),
+    })
+
+
+def ingest_csv(file, memory_ceiling=DEFAULT_MEMORY_CEILING, progress=None, queued=None, **read_kw):
+    """Stream a CSV in chunks and build the aggregates the chart templates need.
+
+    `file` is a path or a seekable binary file object (e.g. a Streamlit
+    UploadedFile). Chunk size is derived from the first chunk's per-row footprint so that one
+    chunk uses at most a quarter of `memory_ceiling`; per-label tables get
+    another half, the rest is headroom for pandas temporaries. `progress`, if
+    given, is called with a fraction in [0, 1] after every chunk. While
+    other uploads hold every slot, `queued`, if given, is called about once
+    a second with the seconds waited so far; IngestBusy is raised if no slot
+    frees up within QUEUE_TIMEOUT_S.
+
+    Files that are not UTF-8 are re-read as Latin-1 unless `encoding` is
+    given. Empty or malformed files raise pandas' EmptyDataError/ParserError.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            return ingest_csv(fh, memory_ceiling, progress, queued, **read_kw)
+
+    try:
+        return _ingest(file, memory_ceiling, progress, queued, **read_kw)
+    except UnicodeDecodeError:
+        # not UTF-8: spreadsheet exports (like data/Final_Data.csv) are
+        # usually Latin-1, which can decode any byte sequence
+        if "encoding" in read_kw or not hasattr(file, "seek"):
+            raise
+        file.seek(0)
+        return _ingest(file, memory_ceiling, progress, queued, encoding="latin-1", **read_kw)
+
+
+def _acquire_slot(queued):
+    start = time.monotonic()
+    while not _INGEST_SLOTS.acquire(timeout=QUEUE_POLL_S):
+        waited = time.monotonic() - start
+        if waited >= QUEUE_TIMEOUT_S:
+            raise IngestBusy(f"all {MAX_CONCURRENT_INGESTS} ingest slots stayed busy for {waited:.0f}s")
+        if queued is not None:
+            queued(waited)
+
+
+def _ingest(file, memory_ceiling, progress, queued, **read_kw):
+    _acquire_slot(queued)
+    try:
+        size = _size_of(file)
+        head = pd.read_csv(file, nrows=SCHEMA_ROWS, **read_kw)
+        schema = infer_schema(head)
+        numeric = [c for c, kind in schema.items() if kind == "numeric"]
+        labels = [c for c, kind in schema.items() if kind == "text"]
+
+        row_bytes = max(1, approx_bytes(_coerce(head, schema)) // max(1, len(head)))
+        chunksize = max(1000, memory_ceiling // 4 // row_bytes)
+        label_budget = memory_ceiling // 2 // max(1, len(labels))
+
+        if hasattr(file, "seek"):
+            file.seek(0)
+        reader = pd.read_csv(file, chunksize=chunksize, **read_kw)
+
+        state = {"rows": 0, "totals": None, "by_label": {c: None for c in labels}, "truncated": False}
+
+        def chunks():
+            for raw in reader:
+                chunk = _coerce(raw, schema)
+                state["rows"] += len(chunk)
+                if numeric:
+                    state["totals"] = _merge_totals(state["totals"], chunk, numeric)
+                for label in labels:
+                    state["by_label"][label] = _merge_labels(
+                        state["by_label"][label], chunk, label, numeric, label_budget, state
+                    )
+                if progress is not None:
+                    progress(_position(file, size))
+                yield chunk
+
+        sample = reservoir_sample(chunks(), SAMPLE_ROWS)
+        if progress is not None:
+            progress(1.0)
+    finally:
+        _INGEST_SLOTS.release()
+
+    totals = state["totals"]
+    if totals is not None:
+        totals["mean"] = totals["sum"] / totals["count"].replace(0, np.nan)
+    return IngestResult(schema, state["rows"], totals, state["by_label"], sample, state["truncated"])
+
+
+def _merge_labels(acc, chunk, label, numeric, budget, state):
+    part = chunk.groupby(label, dropna=True)[numeric].sum(min_count=1)
+    part["rows"] = chunk.groupby(label, dropna=True).size()
+    if acc is not None:
+        part = acc.add(part, fill_value=0)
+    if approx_bytes(part) > budget:
+        # too many distinct labels: keep the largest ones by every column the
+        # templates can rank by (any numeric column, or row count), and flag
+        # the result as approximate
+        ranks = numeric + ["rows"]
+        keep = max(TOP_LABELS, len(part) // 2 // len(ranks))
+        survivors = pd.Index([])
+        for col in ranks:
+            survivors = survivors.union(part[col].nlargest(keep).index)
+        part = part.loc[survivors]
+        state["truncated"] = True
+    return part
+
+
+def _size_of(file):
+    if hasattr(file, "size"):
+        return file.size
+    if hasattr(file, "getbuffer"):
+        return file.getbuffer().nbytes
+    if hasattr(file, "fileno"):
+        return os.fstat(file.fileno()).st_size
+    return 0
+
+
+def _position(file, size):
+    if not hasattr(file, "tell") or not size:
+        return 0.0
+    return min(1.0, file.tell() / size)
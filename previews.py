@@ -0,0 +1,121 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import plotly.graph_objects as go
+import streamlit as st
+
+from cache import LRUCache
+
+# Static PNG previews keyed by figure version (e.g. chart_specs.spec_hash).
+IMAGE_CACHE = LRUCache("images", max_entries=128, max_bytes=64 * 1024 * 1024)
+
+PREVIEW_WIDTH = 800
+PREVIEW_HEIGHT = 450
+# `python chart_specs.py --out DIR` writes previews here next to the figures,
+# so a fresh worker can show images on the first visit.
+PREVIEW_DIR = os.environ.get("PREBUILT_FIGURES_DIR", "prebuilt")
+# After a failed export, wait this long before trying again (doubling up to
+# an hour) instead of starting a browser for every chart.
+EXPORT_RETRY_S = float(os.environ.get("PREVIEW_EXPORT_RETRY_S", "60"))
+
+_log = logging.getLogger("previews")
+
+# Exporting a PNG starts a headless browser (kaleido), which is far slower
+# than building the figure, so previews are rendered off the script thread.
+_render_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+_pending = set()
+_pending_lock = threading.Lock()
+_retry_at = 0.0
+_backoff = EXPORT_RETRY_S
+
+
+def preview_path(version, out_dir=PREVIEW_DIR):
+    return os.path.join(out_dir, f"preview.{version}.png")
+
+
+def export_png(fig):
+    """PNG bytes for `fig`; raises if kaleido or Chrome is unavailable."""
+    return fig.to_image(format="png", width=PREVIEW_WIDTH, height=PREVIEW_HEIGHT)
+
+
+def _export_failed(error):
+    global _retry_at, _backoff
+    _log.error(
+        "Preview export failed (%s); retrying in %.0fs. kaleido needs Chrome: "
+        "run `plotly_get_chrome` or install the packages in packages.txt.", error, _backoff
+    )
+    _retry_at = time.monotonic() + _backoff
+    _backoff = min(_backoff * 2, 3600)
+
+
+def _render(version, fig, deps):
+    global _backoff
+    try:
+        IMAGE_CACHE.put(version, export_png(fig), deps)
+        _backoff = EXPORT_RETRY_S
+    except Exception as e:
+        _export_failed(e)
+    finally:
+        with _pending_lock:
+            _pending.discard(version)
+
+
+def _check_export():
+    try:
+        export_png(go.Figure())
+    except Exception as e:
+        _export_failed(e)
+
+
+_checked = threading.Event()
+
+
+def check_export():
+    """Try one tiny export in the background, once per process, so a missing
+    Chrome shows up in the log at startup rather than on the first chart."""
+    if not _checked.is_set():
+        _checked.set()
+        _render_pool.submit(_check_export)
+
+
+def static_preview(fig, version, deps=()):
+    """Cached PNG bytes for `fig`, or None while it is still being rendered."""
+    png = IMAGE_CACHE.get(version)
+    if png is None and os.path.exists(preview_path(version)):
+        with open(preview_path(version), "rb") as f:
+            png = IMAGE_CACHE.put(version, f.read(), deps)
+    if png is None and time.monotonic() >= _retry_at:
+        with _pending_lock:
+            if version not in _pending:
+                _pending.add(version)
+                _render_pool.submit(_render, version, fig, deps)
+    return png
+
+
+def progressive_chart(container, fig, key, version, deps=()):
+    """Show `fig` as a static image that the reader can switch to interactive.
+
+    `version` must change whenever the figure does (chart_specs.spec_hash
+    for spec charts); it names the preview, so a rerun never re-serializes
+    the figure. The interactive chart is an ordinary st.plotly_chart (same
+    plotly.js and theme as the rest of the page), rendered in a fragment so
+    switching reruns only this chart. Until a preview has been exported the
+    chart is shown interactive straight away.
+    """
+    png = static_preview(fig, version, deps)
+    with container.container():
+        _preview_or_chart(fig, png, key)
+
+
+@st.fragment
+def _preview_or_chart(fig, png, key):
+    live = f"{key}_interactive"
+    if png is None or st.session_state.get(live):
+        st.plotly_chart(fig, use_container_width=True, key=f"{key}_chart")
+        return
+    st.image(png, use_container_width=True)
+    st.button("Interact with this chart", key=f"{key}_upgrade",
+              on_click=lambda: st.session_state.update({live: True}))
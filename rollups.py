@@ -0,0 +1,157 @@
+import pandas as pd
+import plotly.express as px
+
+from cache import LRUCache, file_version
+from datasets import load_csv
+
+POPULATION = "data/2018worldpop.csv"
+CONTINENTS = "data/globconum.csv"
+# Countries no continent source knows are grouped here in continent rollups.
+UNASSIGNED = "Other"
+
+# Country-level datasets and the total each is normalized from; `kg` converts
+# one unit of the total to kilograms.
+MEASURES = {
+    "Coffee consumption": {
+        "path": "data/coffee-consumption-by-country-2025.csv",
+        "total": "CoffeeConsumption_Consumption_tonnes_2022",
+        "kg": 1e3,
+    },
+    "Coffee production": {
+        "path": "data/coffee-producing-countries-2025.csv",
+        "total": "CoffeeProducing_CoffeeProduction_tonnes_2022",
+        "kg": 1e3,
+    },
+    "Milk consumption": {
+        "path": "data/milk-consumption-by-country-2025.csv",
+        "total": "MilkConsumption_TotalConsumption_Kilotonnes_2022",
+        "kg": 1e6,
+    },
+}
+
+# Dataset country names that 2018worldpop.csv spells differently.
+POPULATION_NAMES = {
+    "Cape Verde": "Cabo Verde",
+    "DR Congo": "D.R. Congo",
+    "Eswatini": "Swaziland",
+    "Hong Kong": "China Hong Kong SAR",
+    "Ivory Coast": "Côte d'Ivoire",
+    "Macau": "China Macao SAR",
+    "Micronesia": "Micronesia (Fed. States of)",
+    "Moldova": "Republic of Moldova",
+    "North Macedonia": "TFYR Macedonia",
+    "Republic of the Congo": "Congo",
+    "Russia": "Russian Federation",
+    "South Korea": "Republic of Korea",
+    "Syria": "Syrian Arab Republic",
+    "United States": "United States of America",
+    "Vietnam": "Viet Nam",
+}
+
+# globconum.csv only covers ~65 countries. Next come plotly's bundled
+# gapminder data (142 countries, with one "Americas" split below), then
+# this list for the small states neither of them has.
+SOUTH_AMERICA = {
+    "Argentina", "Bolivia", "Brazil", "Chile", "Colombia", "Ecuador",
+    "Paraguay", "Peru", "Uruguay", "Venezuela",
+}
+CONTINENT_FALLBACK = {
+    "Antigua and Barbuda": "North America", "Armenia": "Asia", "Azerbaijan": "Asia",
+    "Bahamas": "North America", "Barbados": "North America", "Belarus": "Europe",
+    "Belize": "North America", "Bhutan": "Asia", "Cape Verde": "Africa",
+    "Cook Islands": "Oceania", "DR Congo": "Africa", "Dominica": "North America",
+    "Eswatini": "Africa", "Fiji": "Oceania", "French Polynesia": "Oceania",
+    "Georgia": "Asia", "Grenada": "North America", "Guyana": "South America",
+    "Hong Kong": "Asia", "Ivory Coast": "Africa", "Kazakhstan": "Asia",
+    "Kiribati": "Oceania", "Kyrgyzstan": "Asia", "Laos": "Asia", "Macau": "Asia",
+    "Maldives": "Asia", "Marshall Islands": "Oceania", "Micronesia": "Oceania",
+    "Moldova": "Europe", "Nauru": "Oceania", "New Caledonia": "Oceania",
+    "North Macedonia": "Europe", "Papua New Guinea": "Oceania", "Qatar": "Asia",
+    "Republic of the Congo": "Africa", "Saint Kitts and Nevis": "North America",
+    "Saint Lucia": "North America", "Saint Vincent and the Grenadines": "North America",
+    "Samoa": "Oceania", "Seychelles": "Africa", "Solomon Islands": "Oceania",
+    "South Sudan": "Africa", "Suriname": "South America", "Tajikistan": "Asia",
+    "Timor-Leste": "Asia", "Tonga": "Oceania", "Turkmenistan": "Asia",
+    "Tuvalu": "Oceania", "United Arab Emirates": "Asia", "Uzbekistan": "Asia",
+    "Vanuatu": "Oceania", "Yemen": "Asia",
+}
+
+# Precomputed tables per measure, rebuilt only when one of its three source
+# files changes. Shared between sessions: never modify them in place.
+ROLLUP_CACHE = LRUCache("rollups", max_entries=16, max_bytes=64 * 1024 * 1024)
+
+
+def source_paths(measure):
+    return (MEASURES[measure]["path"], POPULATION, CONTINENTS)
+
+
+def _population():
+    pop = load_csv(POPULATION).set_index("Country")["Population"]
+    return pop, pop.sum()
+
+
+def _continents():
+    """Country -> continent in globconum.csv's naming, most specific source first."""
+    gap = px.data.gapminder()[["country", "continent"]].drop_duplicates().set_index("country")["continent"]
+    americas = gap == "Americas"
+    gap[americas] = ["South America" if c in SOUTH_AMERICA else "North America" for c in gap.index[americas]]
+    # globconum.csv lists most countries twice
+    own = load_csv(CONTINENTS).drop_duplicates("Country").set_index("Country")["Continent"]
+    return pd.concat([own, gap, pd.Series(CONTINENT_FALLBACK)]).groupby(level=0).first()
+
+
+def build_rollups(measure):
+    """Join population and continent onto one dataset and roll it up.
+
+    Returns {"countries": frame indexed by country, "continents": frame
+    indexed by continent}, each with the raw total, population,
+    kg_per_person and share_of_world (% of the dataset's world total).
+    Countries also get share_of_population (% of world population), so
+    share_of_world / share_of_population shows over- or under-indexing.
+    Continent per-capita figures only count countries with a known
+    population, so numerator and denominator cover the same countries;
+    `countries` says how many each continent row sums.
+    """
+    spec = MEASURES[measure]
+    pop, world_pop = _population()
+    df = load_csv(spec["path"])
+    countries = pd.DataFrame({
+        "country": df["country"],
+        "continent": df["country"].map(_continents()).fillna(UNASSIGNED),
+        "total": df[spec["total"]],
+        "population": df["country"].replace(POPULATION_NAMES).map(pop),
+    }).dropna(subset=["total"]).drop_duplicates("country").set_index("country").sort_index()
+
+    world_total = countries["total"].sum()
+    countries["kg_per_person"] = countries["total"] * spec["kg"] / countries["population"]
+    countries["share_of_world"] = countries["total"] / world_total * 100
+    countries["share_of_population"] = countries["population"] / world_pop * 100
+
+    known = countries.dropna(subset=["population"])
+    continents = countries.groupby("continent").agg(total=("total", "sum"), countries=("total", "size"))
+    per_capita = known.groupby("continent")[["total", "population"]].sum()
+    continents["population"] = per_capita["population"]
+    continents["kg_per_person"] = per_capita["total"] * spec["kg"] / per_capita["population"]
+    continents["share_of_world"] = continents["total"] / world_total * 100
+    continents = continents.sort_values("total", ascending=False)
+    return {"countries": countries, "continents": continents}
+
+
+def rollups_for(measure):
+    paths = source_paths(measure)
+    key = (measure, tuple(file_version(p) for p in paths))
+    return ROLLUP_CACHE.get_or_set(key, lambda: build_rollups(measure), deps=paths)
+
+
+def precompute():
+    """Build every measure's tables up front so later views are lookups."""
+    for measure in MEASURES:
+        rollups_for(measure)
+
+
+def country_table(measure):
+    return rollups_for(measure)["countries"]
+
+
+def continent_table(measure):
+    return rollups_for(measure)["continents"]
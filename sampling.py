@@ -0,0 +1,139 @@
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from cache import LRUCache, file_version, frame_version
+
+# Samples are memoized by (kind, dataset version, strata, size, seed).
+SAMPLE_CACHE = LRUCache("samples", max_entries=256, max_bytes=64 * 1024 * 1024)
+
+# Upper bound on points per scatter; small datasets pass through unchanged.
+MAX_SCATTER_POINTS = 5000
+
+
+def seed_for(*parts):
+    """Stable integer seed from arbitrary labels (e.g. a selectbox value).
+
+    Python's built-in hash() is salted per process, so it would give a
+    different sample on every worker restart; crc32 does not.
+    """
+    return zlib.crc32("|".join(map(str, parts)).encode())
+
+
+def _allocate(sizes, n):
+    """Split `n` across strata in proportion to `sizes` (largest remainder)."""
+    total = sizes.sum()
+    exact = sizes / total * n
+    alloc = np.floor(exact).astype(int)
+    short = n - alloc.sum()
+    if short > 0:
+        order = np.argsort(-(exact - alloc).values, kind="stable")[:short]
+        alloc.iloc[order] += 1
+    return alloc.clip(upper=sizes)
+
+
+def stable_sample(df, n, seed=0, version=None, deps=()):
+    """Seeded simple random sample of at most `n` rows, memoized.
+
+    `version` is a cheap token identifying `df` (e.g. built from
+    cache.file_version of its source); without it the whole frame is
+    hashed on every call. `deps` names the source files, so clearing a
+    dataset drops its samples.
+    """
+    if len(df) <= n:
+        return df
+    version = version or frame_version(df)
+    return SAMPLE_CACHE.get_or_set(
+        ("simple", version, None, n, seed),
+        lambda: df.sample(n, random_state=seed).sort_index(),
+        deps=deps,
+    )
+
+
+def stratified_sample(df, by, n, seed=0, version=None, deps=()):
+    """Seeded sample of at most `n` rows with each stratum kept in proportion.
+
+    `by` is a column name, a list of column names, or a Series aligned with
+    `df` (e.g. an income band computed with pd.qcut). Rows are returned in
+    their original order so the figure looks the same on every rerun.
+    When `version` is given it must also pin down a Series `by` (derive
+    both from the same source), since neither is hashed then.
+    """
+    if len(df) <= n:
+        return df
+    if isinstance(by, pd.Series):
+        keys = by
+        strata = (by.name or "strata",) if version else (by.name or "strata", frame_version(by.to_frame()))
+    else:
+        cols = [by] if isinstance(by, str) else list(by)
+        keys = [df[c] for c in cols]
+        strata = tuple(cols)
+    version = version or frame_version(df)
+
+    def build():
+        groups = df.groupby(keys, observed=True, dropna=False, sort=True)
+        alloc = _allocate(groups.size(), n)
+        # size() and iteration share the group order, so zip lines them up
+        parts = [
+            g.sample(k, random_state=seed)
+            for (_, g), k in zip(groups, alloc)
+            if k > 0
+        ]
+        return pd.concat(parts).sort_index()
+
+    return SAMPLE_CACHE.get_or_set(("stratified", version, strata, n, seed), build, deps=deps)
+
+
+def reservoir_sample(chunks, n, seed=0):
+    """Uniform sample of `n` rows from an iterable of DataFrame chunks.
+
+    Algorithm R over a chunked reader (`pd.read_csv(..., chunksize=...)`), so
+    only one chunk plus the reservoir is ever held in memory.
+    """
+    rng = np.random.default_rng(seed)
+    slots = []
+    columns = None
+    seen = 0
+    for chunk in chunks:
+        if columns is None:
+            columns = chunk.columns
+        start = 0
+        if len(slots) < n:
+            fill = chunk.iloc[: n - len(slots)]
+            slots.extend(fill.to_dict("records"))
+            start = len(fill)
+        rest = len(chunk) - start
+        if rest > 0:
+            positions = np.arange(seen + start, seen + len(chunk))
+            targets = rng.integers(0, positions + 1)
+            keep = np.flatnonzero(targets < n)
+            # later rows overwrite earlier ones in the same slot, as in Algorithm R
+            for pos, record in zip(targets[keep], chunk.iloc[start + keep].to_dict("records")):
+                slots[pos] = record
+        seen += len(chunk)
+    return pd.DataFrame(slots, columns=columns)
+
+
+def reservoir_sample_csv(path, n, seed=0, chunksize=50_000, **read_kw):
+    """Memoized reservoir sample of a CSV on disk, read in chunks."""
+    return SAMPLE_CACHE.get_or_set(
+        # chunk boundaries change the random draws, so they are part of the key
+        ("reservoir", file_version(path), (chunksize, repr(sorted(read_kw.items()))), n, seed),
+        lambda: reservoir_sample(
+            pd.read_csv(path, chunksize=chunksize, **read_kw), n, seed=seed
+        ),
+        deps=(path,),
+    )
+
+
+def cap_points(df, max_points, by=None, seed=0, version=None, deps=()):
+    """Limit a scatter's input to `max_points` rows, reproducibly.
+
+    Small frames pass through untouched, so the demos only change on large data.
+    """
+    if len(df) <= max_points:
+        return df
+    if by is None:
+        return stable_sample(df, max_points, seed=seed, version=version, deps=deps)
+    return stratified_sample(df, by, max_points, seed=seed, version=version, deps=deps)
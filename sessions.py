@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from cache import approx_bytes
+
+# Heavy per-session objects are dropped after this long without a rerun...
+SESSION_IDLE_S = float(os.environ.get("SESSION_IDLE_S", "600"))
+# ...and the oldest idle sessions lose theirs early when the objects all
+# sessions keep here together pass this.
+SESSION_MEMORY_CEILING = int(os.environ.get("SESSION_MEMORY_CEILING_MB", "256")) * 1024 * 1024
+# How often a background thread sweeps, so abandoned tabs are freed even when
+# no session is running the script.
+SWEEP_INTERVAL_S = float(os.environ.get("SESSION_SWEEP_INTERVAL_S", "60"))
+
+_log = logging.getLogger("sessions")
+
+
+def session_id():
+    """Id of the session running the current script ("local" outside a script run)."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else "local"
+
+
+def _is_connected(sid):
+    if not Runtime.exists():
+        return True
+    return Runtime.instance().is_active_session(sid)
+
+
+class SessionStore:
+    """Per-session home for heavy objects (e.g. an ingested upload).
+
+    Anything kept in st.session_state lives until the browser tab
+    disconnects, so an abandoned tab pins its data for good. Objects put
+    here are sized on the way in and attributed to the session that owns
+    them; `sweep()` drops them once the session has been idle for
+    `idle_s`, and the oldest idle sessions go first when the total passes
+    `max_bytes`. Callers must treat a missing object as "rebuild it".
+
+    Each session's widget state (which holds its uploaded files) is sized
+    too, for reporting only: Streamlit owns it, so it is neither evicted
+    nor counted toward `max_bytes`.
+    """
+
+    def __init__(self, idle_s=SESSION_IDLE_S, max_bytes=SESSION_MEMORY_CEILING):
+        self.idle_s = idle_s
+        self.max_bytes = max_bytes
+        # session id -> {"seen": monotonic time, "objects": {name: (value, bytes)}, "state_bytes": n},
+        # least recently seen first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._sweeper = None
+        self.bytes = 0
+        self.evictions = 0
+
+    def _session(self, sid):
+        if sid not in self._sessions:
+            self._sessions[sid] = {"seen": time.monotonic(), "objects": {}, "state_bytes": 0}
+        return self._sessions[sid]
+
+    def touch(self):
+        """Mark the current session active and size its widget state."""
+        sid = session_id()
+        state_bytes = sum(approx_bytes(v) for v in st.session_state.to_dict().values())
+        with self._lock:
+            self._start_sweeper()
+            session = self._session(sid)
+            session["seen"] = time.monotonic()
+            session["state_bytes"] = state_bytes
+            self._sessions.move_to_end(sid)
+
+    def get(self, name, default=None):
+        with self._lock:
+            session = self._sessions.get(session_id())
+            if session is None or name not in session["objects"]:
+                return default
+            return session["objects"][name][0]
+
+    def put(self, name, value):
+        size = approx_bytes(value)
+        sid = session_id()
+        with self._lock:
+            session = self._session(sid)
+            if name in session["objects"]:
+                self.bytes -= session["objects"].pop(name)[1]
+            session["objects"][name] = (value, size)
+            self.bytes += size
+            self._enforce_ceiling(keep=sid)
+        return value
+
+    def sweep(self, keep=None):
+        """Drop idle sessions' objects and forget disconnected sessions.
+
+        `keep` (a session id) is spared when enforcing the ceiling.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for sid in list(self._sessions):
+                session = self._sessions[sid]
+                if not _is_connected(sid):
+                    self._drop(sid)
+                    del self._sessions[sid]
+                elif session["objects"] and now - session["seen"] > self.idle_s:
+                    self._drop(sid)
+                    self.evictions += 1
+            self._enforce_ceiling(keep)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "session": sid,
+                "objects": len(s["objects"]),
+                "bytes": sum(size for _, size in s["objects"].values()),
+                "state_bytes": s["state_bytes"],
+                "idle_s": now - s["seen"],
+            } for sid, s in reversed(self._sessions.items())]
+
+    def _drop(self, sid):
+        session = self._sessions[sid]
+        self.bytes -= sum(size for _, size in session["objects"].values())
+        session["objects"].clear()
+
+    def _enforce_ceiling(self, keep):
+        # least recently seen first; never evict the session asking for memory
+        for sid, session in self._sessions.items():
+            if self.bytes <= self.max_bytes:
+                break
+            if sid != keep and session["objects"]:
+                self._drop(sid)
+                self.evictions += 1
+
+    def _start_sweeper(self):
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="session-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(SWEEP_INTERVAL_S)
+            try:
+                self.sweep()
+            except Exception:
+                _log.exception("Session sweep failed")
+
+
+SESSIONS = SessionStore()